@@ -13,6 +13,315 @@ Created on Wed Feb 10 11:14:22 2016
 
 """ 
 
+# ----------------------------------------------- PEAK FINDER HELPERS -------------------------------------------------
+
+# These functions are the vectorized building blocks shared by the peak finders below. Each one performs, for the whole signal
+# at once, a step that the original peak finders do one sample at a time inside their for loops. The original loops are kept in
+# each peak finder as engine = 'loop' so the two can be checked against each other.
+
+# PEAK STATUS ---------------------
+
+# Every peak that met the peak criteria is either kept (ACCEPTED) or ignored by one of the optional criteria of the peak finders.
+# The status records which.
+
+ACCEPTED = 0                # a positively identified peak
+IGNORED_DISTANCE = 1        # closer than min_peak_distance to the previous positively identified peak
+IGNORED_THRESHOLD = 2       # closer than min_amount_from_threshold to its threshold
+IGNORED_CONSISTENCY = 3     # its value was within peak_value_consistancy_fraction of the previous positively identified peak
+
+PEAK_STATUS_NAMES = ('accepted', 'ignored-distance', 'ignored-threshold', 'ignored-consistency')   # PEAK_STATUS_NAMES[status] describes a status
+
+# COMPACT PEAK RESULT ---------------------
+
+# The compact output of the peak finders (compact = True). Rather than several arrays, some of which are the length of the signal, it
+# is a single numpy structured array with one row per peak, kept or ignored, in index order. The columns are 32 bit, so a result is
+# 13 bytes per peak and is cheap to pickle, eg when sending results between processes.
+#     result['index']: int32, index of the peak in the signal. For signals longer than the largest int32 (2**31-1 samples) it is int64
+#                      instead (COMPACT_PEAK_RESULT_DTYPE_LONG), so the indices of long traces dont wrap round to negative numbers.
+#     result['value']: float32, signal value of the peak
+#     result['threshold']: float32, threshold at the peak
+#     result['status']: int8, the PEAK STATUS of the peak, eg result[result['status'] == ACCEPTED] are the positively identified peaks
+# NB the value and threshold columns are rounded to float32 (about 7 significant figures), so they cant be compared for exact equality
+# with the float64 values and thresholds of the normal outputs, compare them to within float32 rounding, or compare the indices instead.
+
+COMPACT_PEAK_RESULT_DTYPE = [('index', 'i4'), ('value', 'f4'), ('threshold', 'f4'), ('status', 'i1')]
+COMPACT_PEAK_RESULT_DTYPE_LONG = [('index', 'i8'), ('value', 'f4'), ('threshold', 'f4'), ('status', 'i1')]
+
+def _compact_peak_result(index, value, threshold, status, signal_length):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import empty, argsort, iinfo
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    order = argsort(index, kind = 'stable')
+    dtype = COMPACT_PEAK_RESULT_DTYPE if signal_length <= iinfo('i4').max else COMPACT_PEAK_RESULT_DTYPE_LONG
+    result = empty(len(index), dtype = dtype)
+    result['index'] = index[order]
+    result['value'] = value[order]
+    result['threshold'] = threshold[order]
+    result['status'] = status[order]
+    
+    return(result)
+
+# PLATEAU PEAK CANDIDATES ---------------------
+
+# Returns the indices i (1 <= i <= len(signal)-2) that meet the peak criteria used in the for loops of basic_peak_finder and
+# adaptive_peak_finder, that is:
+#   signal[i] >= thresholds[i] and signal[i] > signal[i-1] and signal[i] > signal[i+j]
+# where signal[i+j] is the first point after signal[i] that isnt equal to signal[i] (the flat-top rule, see the while statement in
+# basic_peak_finder). Rather than stepping along each flat section, the index of the next change in value is found for every point
+# with a single searchsorted on the indices where the signal changes value.
+
+# NB the loop version raises an IndexError if a flat section runs to the end of the signal, here it is simply not a peak.
+
+# INPUTS ---------------------
+
+# signal: array of full signal you are interested in finding peaks for
+# thresholds: either a single threshold value or an array of at least len(signal)-1 thresholds, one for each point in signal
+
+def _plateau_peak_candidates(signal, thresholds):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange, flatnonzero, searchsorted, ndim, zeros, int_
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    N = len(signal)
+    if N < 3:
+        return(zeros(0, dtype = int_))     # a peak needs a neighbour either side of it, so there can be no peaks
+    
+    if ndim(thresholds) == 0:
+        above_threshold = signal[1:N-1] >= thresholds
+    else:
+        above_threshold = signal[1:N-1] >= thresholds[1:N-1]
+    
+    # First criteria, above the threshold and above the previous neighbour
+    candidates = arange(1, N-1)[above_threshold & (signal[1:N-1] > signal[0:N-2])]
+    
+    # Finding signal[i+j] for every candidate. value_changes holds every index whose value differs from the point before it, so the
+    # first value_change after i is the first point after the flat section (if any) that i sits on.
+    value_changes = flatnonzero(signal[1:] != signal[:-1]) + 1
+    next_change = searchsorted(value_changes, candidates, side = 'right')
+    
+    candidates = candidates[next_change < len(value_changes)]      # dropping flat sections that run to the end of the signal
+    next_change = value_changes[next_change[next_change < len(value_changes)]]
+    
+    # Second criteria, the point after the flat section must be less than signal[i]
+    return(candidates[signal[candidates] > signal[next_change]])
+
+# CENTRED CUMULATIVE SUM ---------------------
+
+# Returns the running sum of (signal - reference) with carry prepended, ie cumulative_sum[k] - cumulative_sum[0] is the sum of the
+# first k points. The sum of any window signal[a:b] is then cumulative_sum[b] - cumulative_sum[a], so the moving mean for every
+# point can be found in one pass instead of calling .mean() on a new window for each point.
+
+# Subtracting a reference (normally signal[0]) before summing keeps the running sum small, which limits the rounding error that
+# builds up over millions of points. Passing the last value of a previous cumulative sum as carry continues that sum exactly, since
+# numpy's cumsum adds one point at a time, which lets a signal that arrives in chunks give the same sums as the whole signal.
+
+# INPUTS ---------------------
+
+# signal: array of the signal (or the next chunk of the signal) to sum
+# reference: value subtracted from every point before summing, add it back onto any window mean calculated from the sum
+# carry: the value the running sum starts from
+
+def _centred_cumsum(signal, reference, carry = 0.0):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import asarray, concatenate, cumsum
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    return(cumsum(concatenate(([carry], asarray(signal, dtype = float) - reference))))
+
+# ADAPTIVE THRESHOLDS ---------------------
+
+# Returns the thresholds adaptive_peak_finder uses for the points start to stop-1 of a signal N points long, where the threshold of
+# point i is the mean of signal[max(i-(window_length-1)/2, 0) : min(i+(window_length-1)/2+1, N)] + vert_offset. This one expression
+# covers all three of the edge window rules used in the loop of adaptive_peak_finder.
+
+# INPUTS ---------------------
+
+# cumulative_sum: output of _centred_cumsum, where cumulative_sum[k - offset] is the running sum up to (not including) point k 
+# reference: the reference that was subtracted when cumulative_sum was calculated
+# start, stop: the range of points to calculate the thresholds for
+# N: the length of the full signal
+# offset: the index in the full signal of the first point summed in cumulative_sum (non zero when working on a chunk of a signal)
+
+def _adaptive_thresholds(cumulative_sum, reference, window_length, vert_offset, start, stop, N, offset = 0):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange, maximum, minimum
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    half_window = int((window_length-1)/2)
+    i = arange(start, stop)
+    window_start = maximum(i - half_window, 0)
+    window_stop = minimum(i + half_window + 1, N)
+    
+    window_sum = cumulative_sum[window_stop - offset] - cumulative_sum[window_start - offset]
+    return(window_sum/(window_stop - window_start) + reference + vert_offset)
+
+# MAX PEAK THRESHOLDS ---------------------
+
+# Returns the thresholds max_peak_finder uses for the points start to stop-1 of a signal N points long. Interior points use the mean of
+# the window centred on them, while the first and last (window_length-1)/2 points use the mean of the first and last full window
+# length of the signal, as in the loop of max_peak_finder.
+
+# INPUTS ---------------------
+
+# see _adaptive_thresholds
+
+def _max_peak_thresholds(cumulative_sum, reference, window_length, vert_offset, start, stop, N, offset = 0):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    return(_max_peak_thresholds_at(cumulative_sum, reference, window_length, vert_offset, arange(start, stop), N, offset))
+
+# As _max_peak_thresholds, but for the points in the index array i rather than a range of points
+def _max_peak_thresholds_at(cumulative_sum, reference, window_length, vert_offset, i, N, offset = 0):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import where
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    half_window = int((window_length-1)/2)
+    window_start = where(i <= half_window, 0, where(i >= N - half_window, max(N - window_length, 0), i - half_window))
+    window_stop = where(i <= half_window, min(window_length, N), where(i >= N - half_window, N, i + half_window + 1))
+    
+    window_sum = cumulative_sum[window_stop - offset] - cumulative_sum[window_start - offset]
+    return(window_sum/(window_stop - window_start) + reference + vert_offset)
+
+# PEAK PROPERTIES ---------------------
+
+# Calculates the prominence, bases and width of every peak found by a peak finder, so they dont need to be worked out separately.
+# The prominence of a peak is how far it stands above the higher of its two bases, where the left (right) base is the lowest point
+# between the peak and the nearest higher point to its left (right), or the start (end) of the signal if there isnt one. The width
+# is measured at rel_height of the prominence below the peak, eg rel_height = 0.5 gives the width at half the prominence.
+
+# This uses scipy.signal.peak_prominences and peak_widths, which are compiled and only walk out from each peak as far as its bases,
+# rather than going over the whole signal again. prominence_wlen limits how far they walk (in points, centred on the peak), which
+# bounds the cost on very long signals but means the bases are only searched for within that window.
+
+# INPUTS ---------------------
+
+# signal: array of full signal the peaks were found in
+# peak_index: indices of the peaks
+# rel_height: the fraction of the prominence below the peak the width is measured at
+# prominence_wlen: window length (in points) the bases are searched for in, if unspecified the whole signal is used
+
+# OUTPUTS --------------------
+# peak_properties: a dictionary of arrays, with one element per peak:
+#     'prominences', 'left_bases', 'right_bases': the prominence and the indices of the left and right bases
+#     'widths': the width in points at rel_height
+#     'width_heights': the signal value the width was measured at
+#     'left_ips', 'right_ips': the (interpolated) positions of the left and right ends of the width
+
+def _peak_properties(signal, peak_index, rel_height, prominence_wlen = 'unspecified'):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import asarray, intp
+    from scipy.signal import peak_prominences, peak_widths
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    peak_index = asarray(peak_index, dtype = intp)
+    prominences, left_bases, right_bases = peak_prominences(signal, peak_index, wlen = None if prominence_wlen == 'unspecified' else prominence_wlen)
+    widths, width_heights, left_ips, right_ips = peak_widths(signal, peak_index, rel_height = rel_height, prominence_data = (prominences, left_bases, right_bases))
+    
+    return({'prominences': prominences, 'left_bases': left_bases, 'right_bases': right_bases, 'widths': widths, 'width_heights': width_heights, 'left_ips': left_ips, 'right_ips': right_ips})
+
+# Adds the peak properties dictionary to the end of a peak finders outputs if peak_properties is True, peak_index must be outputs[0]
+# NB a compact result (see COMPACT PEAK RESULT) is returned on its own, or as (result, peak properties of the accepted peaks)
+def _with_peak_properties(outputs, signal, peak_properties, rel_height, prominence_wlen):
+    if not isinstance(outputs, tuple):
+        if peak_properties:
+            return(outputs, _peak_properties(signal, outputs['index'][outputs['status'] == ACCEPTED], rel_height, prominence_wlen))
+        return(outputs)
+    
+    if peak_properties:
+        return(outputs + (_peak_properties(signal, outputs[0], rel_height, prominence_wlen),))
+    return(outputs)
+
+# SELECT ADAPTIVE PEAKS ---------------------
+
+# Applies the optional min_peak_distance and min_amount_from_threshold criteria of adaptive_peak_finder to its possible peaks, returning
+# which were kept as peaks and which were ignored.
+
+# INPUTS ---------------------
+
+# possible_peaks: indices of the points that met the peak criteria, in ascending order
+# possible_peak_values, possible_peak_thresholds: the signal values and thresholds at possible_peaks
+# min_peak_distance, min_amount_from_threshold: see adaptive_peak_finder
+# previous_peak: index of the last positively identified peak before possible_peaks, None if there hasnt been one. 
+
+# OUTPUTS --------------------
+# peak_index, ignored_peak_index: the indices of the kept and ignored peaks
+# previous_peak: index of the last positively identified peak, to pass in with the next set of possible peaks
+# status: the PEAK STATUS (see above) of each possible peak
+
+def _select_adaptive_peaks(possible_peaks, possible_peak_values, possible_peak_thresholds, min_peak_distance, min_amount_from_threshold, previous_peak = None):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import zeros, int8, abs as absolute
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    status = zeros(len(possible_peaks), dtype = int8)    # one entry per possible peak rather than per point in the signal
+    
+    if min_amount_from_threshold != 'unspecified':
+        status[absolute(possible_peak_values - possible_peak_thresholds) < min_amount_from_threshold] = IGNORED_THRESHOLD
+    
+    if min_peak_distance != 'unspecified':
+        # min_peak_distance is measured from the previous positively identified peak, so the possible peaks are stepped through in order
+        for k, i in enumerate(possible_peaks.tolist()):
+            if previous_peak is not None and i - previous_peak < min_peak_distance:
+                status[k] = IGNORED_DISTANCE
+            elif status[k] == ACCEPTED:
+                previous_peak = i
+    
+    # Without min_peak_distance whether a peak is kept doesnt depend on the previous peak, so no loop is needed
+    peak_index = possible_peaks[status == ACCEPTED]
+    ignored_peak_index = possible_peaks[status != ACCEPTED]
+    if min_peak_distance == 'unspecified' and len(peak_index) > 0:
+        previous_peak = int(peak_index[-1])
+    
+    return(peak_index, ignored_peak_index, previous_peak, status)
+
+# MAX PEAK STATUS ---------------------
+
+# Applies the optional min_peak_distance, min_amount_from_threshold and peak_value_consistancy_fraction criteria of max_peak_finder
+# to the max peak found between a set of crossings. Returns its PEAK STATUS (see above), ACCEPTED if it is a peak.
+
+# INPUTS ---------------------
+
+# index, value, threshold: the index of the max peak, and the signal value and threshold at that index
+# previous_peak, previous_peak_value: the index and value of the last positively identified max peak, None if there hasnt been one
+# min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction: see max_peak_finder
+
+def _max_peak_status(index, value, threshold, previous_peak, previous_peak_value, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction):
+    
+    if min_peak_distance != 'unspecified' and previous_peak is not None and index - previous_peak < min_peak_distance:
+        return(IGNORED_DISTANCE)
+    
+    elif min_amount_from_threshold != 'unspecified' and abs(value - threshold) < min_amount_from_threshold:
+        return(IGNORED_THRESHOLD)
+    
+    elif peak_value_consistancy_fraction != 'unspecified' and previous_peak is not None and value <= (1+peak_value_consistancy_fraction)*previous_peak_value and value >= (1-peak_value_consistancy_fraction)*previous_peak_value:
+        return(IGNORED_CONSISTENCY)
+    
+    return(ACCEPTED)
+
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+
 # ----------------------------------------------- BASIC PEAK FINDER -------------------------------------------------
 
 # This function looks at points that are above the threshold and if a points two neighbouring points are smaller it concludes a 
@@ -22,11 +331,16 @@ Created on Wed Feb 10 11:14:22 2016
 
 # signal: array of full signal you are interested in finding peaks for
 # threshold: the min value a data point can be for it to be considered a peak
+# engine: either 'vectorized' (default) which finds every peak at once using numpy, or 'loop' which is the original for loop that steps
+#         through the signal one point at a time. Both return identical indices, 'loop' is kept as a reference for checking the
+#         vectorized engine and is much slower on long signals.
+# peak_properties: if True the prominence, bases and width of every peak are also calculated and returned as a dictionary after the
+#                  other outputs, see _peak_properties for its keys. rel_height and prominence_wlen are passed to _peak_properties.
 
-def basic_peak_finder(signal, threshold = 'unspecified'):       # if thershold isnt specified it defaults it is replaced with the mean of the signal
+def basic_peak_finder(signal, threshold = 'unspecified', engine = 'vectorized', peak_properties = False, rel_height = 0.5, prominence_wlen = 'unspecified'):       # if thershold isnt specified it defaults it is replaced with the mean of the signal
     
     # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
-    from numpy import array, int_, append
+    from numpy import array
     
     # -------------------------------------------------------------------------------------------------------------    
 
@@ -35,6 +349,26 @@ def basic_peak_finder(signal, threshold = 'unspecified'):       # if thershold i
     if threshold == 'unspecified':
         threshold = signal.mean()
         
+    if engine == 'vectorized':
+        peak_index = _plateau_peak_candidates(signal, threshold)
+        peak_value = array(signal[peak_index], dtype = float)      # float to match the peak_value array the loop appends to
+        
+    elif engine != 'loop':
+        raise Exception('ERROR, invalid engine input, must be either "vectorized" or "loop".')
+        
+    else:
+        peak_index, peak_value = _basic_peak_finder_loop(signal, threshold)
+    
+    return(_with_peak_properties((peak_index, peak_value), signal, peak_properties, rel_height, prominence_wlen))
+
+# The original loop engine of basic_peak_finder
+def _basic_peak_finder_loop(signal, threshold):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import array, int_, append
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
     # Initializing variables
 
     peak_index = int_([])                           # initializing a peak_index array where the index of the peak in the signal array will be stored as integers
@@ -129,11 +463,23 @@ def basic_peak_finder(signal, threshold = 'unspecified'):       # if thershold i
 # vert_offset: the threshold is calculated as the mean + vert_offset
 # window_length: window length defines the number of points in the moving average used to calculate the moving threshold. It must be odd as we want an even number of points either side of the current point of interest.
 # min_peak_distance = minimum number of data points a possible peak must be from the previous positively identified peak. This is best worked out seperately.
+# engine: either 'vectorized' (default) or 'loop'. The vectorized engine calculates every threshold in one pass using a cumulative sum,
+#         so it costs O(N) rather than O(N*window_length), finds the possible peaks with numpy, and only stores the peaks actually found.
+#         'loop' is the original for loop, kept as a reference. NB the thresholds of the two engines can differ by floating point
+#         rounding, so a point lying exactly on its threshold could be treated differently.
+# interactive: if window_length is missing or even, True asks the user to re-enter it while False raises a MissingInputError or
+#              EvenNumberError (see yes_no_input_checker.py). By default the user is only asked if stdin is a terminal, so the function
+#              never waits for an input that cant come, eg when run in a process pool.
+# peak_properties: if True the prominence, bases and width of every peak are also calculated and returned as a dictionary after the
+#                  other outputs, see _peak_properties for its keys. rel_height and prominence_wlen are passed to _peak_properties.
+# compact: if True (vectorized engine only) a single compact structured array of every peak, kept or ignored, is returned in place of the
+#          other outputs, see COMPACT PEAK RESULT. NB the full length thresholds array is not part of it.
 
-def adaptive_peak_finder(signal, vert_offset = 'unspecified' , window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified'):       # if threshold isnt specified it defaults it is replaced with the mean of the signal
+def adaptive_peak_finder(signal, vert_offset = 'unspecified' , window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified', engine = 'vectorized', interactive = 'unspecified', peak_properties = False, rel_height = 0.5, prominence_wlen = 'unspecified', compact = False):       # if threshold isnt specified it defaults it is replaced with the mean of the signal
     
     # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
-    from numpy import array, int_, append, zeros, ceil, trim_zeros
+    from numpy import array, int_, zeros, ceil, trim_zeros
+    from yes_no_input_checker import interactive_mode, MissingInputError, EvenNumberError
     
     # -------------------------------------------------------------------------------------------------------------    
     # Checking inputs
@@ -143,14 +489,42 @@ def adaptive_peak_finder(signal, vert_offset = 'unspecified' , window_length = '
         vert_offset = 0
         
     if window_length == 'unspecified':
+        if not interactive_mode(interactive):
+            raise MissingInputError('ERROR, no window_length was provided, if you dont want to update the threshold use the basic_peak_finder function')
         print('ERROR, no window_length was provided, if you dont want to update the threshold use the basic_peak_finder function')
         window_length = int(input('Please re-enter the window length: '))
-        return(adaptive_peak_finder(signal, vert_offset, window_length))
+        return(adaptive_peak_finder(signal, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, engine, interactive, peak_properties, rel_height, prominence_wlen, compact))
     
     if window_length%2 == 0:
+        if not interactive_mode(interactive):
+            raise EvenNumberError('ERROR, an even number was entered for the window length, the window length should be odd')
         print('ERROR, an even number was entered for the window length, the window length should be odd')
         window_length = int(input('Please re-enter the window length: '))
-        return(adaptive_peak_finder(signal, vert_offset, window_length))
+        return(adaptive_peak_finder(signal, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, engine, interactive, peak_properties, rel_height, prominence_wlen, compact))
+    
+    if engine == 'vectorized':
+        # Calculating all the thresholds in one pass
+        cumulative_sum = _centred_cumsum(signal, signal[0])
+        thresholds = _adaptive_thresholds(cumulative_sum, signal[0], window_length, vert_offset, 0, len(signal)-1, len(signal))
+        
+        # Finding every point that meets the peak criteria, these are then checked against the optional criteria below
+        possible_peaks = _plateau_peak_candidates(signal, thresholds)
+        
+        peak_index, ignored_peak_index, _, status = _select_adaptive_peaks(possible_peaks, signal[possible_peaks], thresholds[possible_peaks], min_peak_distance, min_amount_from_threshold)
+        
+        if compact:
+            return(_with_peak_properties(_compact_peak_result(possible_peaks, signal[possible_peaks], thresholds[possible_peaks], status, len(signal)), signal, peak_properties, rel_height, prominence_wlen))
+        
+        peak_value = array(signal[peak_index], dtype = float)
+        ignored_peak_value = array(signal[ignored_peak_index], dtype = float)
+        
+        return(_with_peak_properties((peak_index, peak_value, ignored_peak_index, ignored_peak_value, thresholds), signal, peak_properties, rel_height, prominence_wlen))
+    
+    elif engine != 'loop':
+        raise Exception('ERROR, invalid engine input, must be either "vectorized" or "loop".')
+    
+    elif compact:
+        raise Exception('ERROR, the compact output is only available with engine = "vectorized".')
           
     # Initializing varibles (NB when initializing, the most peaks possible would come from a sawtooth wave
     # where every point was either a peak or trough, therefore arrays are initialized to half the signal
@@ -218,7 +592,7 @@ def adaptive_peak_finder(signal, vert_offset = 'unspecified' , window_length = '
     ignored_peak_value = ignored_peak_value[:len(ignored_peak_index)]# trimming the ignored_peak_value array to the length of ignored_peak_index, as they must be the same length, each index is information on the same peak.
     
          
-    return(peak_index, peak_value, ignored_peak_index, ignored_peak_value, thresholds)          # a list of the thresholds is stored so it can be plotted or used for debugging purposes
+    return(_with_peak_properties((peak_index, peak_value, ignored_peak_index, ignored_peak_value, thresholds), signal, peak_properties, rel_height, prominence_wlen))          # a list of the thresholds is stored so it can be plotted or used for debugging purposes
 
 # --------------------------------------------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------
@@ -271,12 +645,30 @@ def adaptive_peak_finder(signal, vert_offset = 'unspecified' , window_length = '
 # min_peak_distance: minimum number of data points a possible peak must be from the previous positively identified peak. This is best worked out seperately.
 # min_amount_from_threshold: minimum amount a peak must be from the threhold, meaning if it gets too close it is still ignored... was useful at some point so I wouldnt remove this feature!
 # peak_value_consistancy_fraction: another optional user input. If the signal peaks are expected to be fairly consistant, peak_value_consistancy_fraction input can be a fraction = x, where a suspected peak must have a value satisfying: (1-x)*previous peak value < suspected peak value < (1+x)*previous peak value, for the suspected peak to be considered a true peak. 
+# engine: either 'vectorized' (default) or 'loop'. The vectorized engine calculates every threshold in one pass using a cumulative sum,
+#         finds every crossing at once from the change in sign of signal - thresholds, and finds the max local peak between every set
+#         of outer crossings with a single numpy.maximum.reduceat, so it runs in O(N) rather than sorting the signal between every set
+#         of crossings. 'loop' is the original for loop, kept as a reference. The outputs of the two engines are the same, except that
+#         the thresholds can differ by floating point rounding, and if two local peaks between a set of outer crossings have exactly the
+#         same value the vectorized engine uses the later one (the order argsort gives equal values in the loop isnt defined).
+# interactive: if an input is invalid, True asks the user to re-enter it while False raises an InvalidInputError (or the MissingInputError
+#              or EvenNumberError subclasses for window_length, see yes_no_input_checker.py). By default the user is only asked if stdin
+#              is a terminal, so the function never waits for an input that cant come, eg when run in a process pool.
+# peak_properties: if True the prominence, bases and width of every max peak are also calculated and returned as a dictionary after the
+#                  other outputs, see _peak_properties for its keys. rel_height and prominence_wlen are passed to _peak_properties.
+# compact: if True (vectorized engine only) a single compact structured array of every max peak, kept or ignored, is returned in place
+#          of the other outputs, see COMPACT PEAK RESULT. NB the full length thresholds and crossings arrays are not part of it.
+# coarse_to_fine: if True (vectorized engine only) blocks of the signal that are entirely below their thresholds are found from a cheap
+#                 pass over block maxes and skipped, see COARSE TO FINE. The peaks found are exactly the same, but the thresholds output
+#                 is nan in the skipped blocks. This is for very long signals that are mostly below the threshold, eg an ECG with a
+#                 vert_offset that only leaves the R waves above it. coarse_block_length sets the block length (in points).
 
 
-def max_peak_finder(signal, threshold = 'unspecified', initial_thres = 'unspecified', vert_offset = 'unspecified' , window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified', peak_value_consistancy_fraction = 'unspecified'):       # if thershold isnt specified it defaults it is replaced with the mean of the signal
+def max_peak_finder(signal, threshold = 'unspecified', initial_thres = 'unspecified', vert_offset = 'unspecified' , window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified', peak_value_consistancy_fraction = 'unspecified', engine = 'vectorized', interactive = 'unspecified', peak_properties = False, rel_height = 0.5, prominence_wlen = 'unspecified', compact = False, coarse_to_fine = False, coarse_block_length = 'unspecified'):       # if thershold isnt specified it defaults it is replaced with the mean of the signal
     
     # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
-    from numpy import array, int_, append, argmax, argsort, zeros, ceil, trim_zeros
+    from numpy import int_, argsort, zeros, ceil, trim_zeros
+    from yes_no_input_checker import interactive_mode, InvalidInputError, MissingInputError, EvenNumberError
     # -------------------------------------------------------------------------------------------------------------
 
     # Checking inputs      
@@ -287,24 +679,44 @@ def max_peak_finder(signal, threshold = 'unspecified', initial_thres = 'unspecif
             vert_offset = 0
         
         if window_length == 'unspecified':
+            if not interactive_mode(interactive):
+                raise MissingInputError('ERROR, no window_length was provided, if you dont want to update the threshold use the basic_peak_finder function')
             print('ERROR, no window_length was provided, if you dont want to update the threshold use the basic_peak_finder function')
             window_length = int(input('Please re-enter the window length: '))
-            return(max_peak_finder(signal, threshold, vert_offset, window_length, min_peak_distance, min_amount_from_threshold,peak_value_consistancy_fraction))
+            return(max_peak_finder(signal, threshold, initial_thres, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction, engine, interactive, peak_properties, rel_height, prominence_wlen, compact, coarse_to_fine, coarse_block_length))
     
         if window_length%2 == 0:
+            if not interactive_mode(interactive):
+                raise EvenNumberError('ERROR, an even number was entered for the window length, the window length should be odd')
             print('ERROR, an even number was entered for the window length, the window length should be odd')
             window_length = int(input('Please re-enter the window length: '))
-            return(max_peak_finder(signal, threshold, vert_offset, window_length, min_peak_distance, min_amount_from_threshold,peak_value_consistancy_fraction))
+            return(max_peak_finder(signal, threshold, initial_thres, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction, engine, interactive, peak_properties, rel_height, prominence_wlen, compact, coarse_to_fine, coarse_block_length))
             
-        if peak_value_consistancy_fraction != 'unspecified' and peak_value_consistancy_fraction <= 0 and peak_value_consistancy_fraction >= 1:
-            print('ERROR, peak_value_consistancy_persentage received an input that was not a fraction between 0 and 1')
-            peak_value_consistancy_fraction = int(input('Please re-enter the fraction: '))
-            return(max_peak_finder(signal, threshold, vert_offset, window_length, min_peak_distance, min_amount_from_threshold,peak_value_consistancy_fraction))
+        if peak_value_consistancy_fraction != 'unspecified' and (peak_value_consistancy_fraction <= 0 or peak_value_consistancy_fraction >= 1):
+            if not interactive_mode(interactive):
+                raise InvalidInputError('ERROR, peak_value_consistancy_fraction received an input that was not a fraction between 0 and 1')
+            print('ERROR, peak_value_consistancy_fraction received an input that was not a fraction between 0 and 1')
+            peak_value_consistancy_fraction = float(input('Please re-enter the fraction: '))
+            return(max_peak_finder(signal, threshold, initial_thres, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction, engine, interactive, peak_properties, rel_height, prominence_wlen, compact, coarse_to_fine, coarse_block_length))
             
     elif threshold != 'unspecified' and vert_offset != 'unspecified' or window_length != 'unspecified':
+        if not interactive_mode(interactive):
+            raise InvalidInputError('ERROR! Threshold has been defined as a constant, but so too has one or more of the adaptive arguments: vert_offset or window_length')
         print('ERROR! Threshold has been defined as a constant, but so too has one or more of the adaptive arguments: vert_offset or window_length')
         print('If the threshold is fixed as a constant the adaptive arguments are not needed and should be left undefined')
         return()
+    
+    if engine == 'vectorized':
+        return(_with_peak_properties(_max_peak_finder_vectorized(signal, threshold, initial_thres, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction, compact, coarse_to_fine, coarse_block_length), signal, peak_properties, rel_height, prominence_wlen))
+    
+    elif engine != 'loop':
+        raise Exception('ERROR, invalid engine input, must be either "vectorized" or "loop".')
+    
+    elif compact:
+        raise Exception('ERROR, the compact output is only available with engine = "vectorized".')
+    
+    elif coarse_to_fine:
+        raise Exception('ERROR, coarse_to_fine is only available with engine = "vectorized".')
         
     # Initilzing varibles   
     ignored_peak_index = zeros(int(ceil(len(signal)/2)), dtype = int_)       # initializing an ignored_peak_index array where the index of the peak that didnt meet the min distance requirement between it and the previous peak are stored
@@ -452,4 +864,680 @@ def max_peak_finder(signal, threshold = 'unspecified', initial_thres = 'unspecif
     outer_crossings = trim_zeros(outer_crossings, 'b')
     inner_crossings = trim_zeros(inner_crossings)      
             
-    return(max_peak_index, max_peak_value, thresholds, outer_crossings, inner_crossings, ignored_peak_index)
+    return(_with_peak_properties((max_peak_index, max_peak_value, thresholds, outer_crossings, inner_crossings, ignored_peak_index), signal, peak_properties, rel_height, prominence_wlen))
+
+# VECTORIZED MAX PEAK FINDER ---------------------
+
+# The vectorized engine of max_peak_finder, the inputs have already been checked by max_peak_finder. It does the same steps as the loop,
+# but on the whole signal at once:
+# 1. every threshold is calculated from a cumulative sum (see _max_peak_thresholds)
+# 2. every crossing is found at once. The crossings then group into windows of 3, [0,1,2], [2,3,4], [4,5,6] etc, where each
+#    window's last outer crossing is the next window's first, so the windows cover the signal from the first crossing without gaps
+#    (plus the end_check window if the signal ends on an inner crossing)
+# 3. every point that isnt a local peak above its threshold is set to -inf, so the max of each window is its max local peak. As the
+#    windows dont overlap, the max of every window is found with one numpy.maximum.reduceat
+# 4. only then are the windows stepped through in order, to apply the min_peak_distance etc criteria which depend on the previous peak
+
+def _max_peak_finder_vectorized(signal, threshold, initial_thres, vert_offset, window_length, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction, compact = False, coarse_to_fine = False, coarse_block_length = 'unspecified'):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import array, int_, int8, zeros, full, inf, flatnonzero, arange, where, maximum, repeat, nan, searchsorted
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    N = len(signal)
+    
+    if coarse_to_fine:
+        # Steps 1 to 3 only at the points of the blocks that could hold a crossing or local peak, see COARSE TO FINE
+        points, point_thresholds, crossing_index, local_peak_index = _coarse_to_fine_candidates(signal, threshold, initial_thres, vert_offset, window_length, coarse_block_length)
+        ends_above = len(crossing_index) > 0 and signal[crossing_index[-1]-1] > point_thresholds[searchsorted(points, crossing_index[-1]-1)]
+        window_starts, window_stops, outer_crossings, inner_crossings = _group_crossings(crossing_index, ends_above)
+        max_index = _window_max_peaks(local_peak_index, signal[local_peak_index], window_starts, window_stops)
+        
+        max_index_thresholds = point_thresholds[searchsorted(points, max_index)]
+        if not compact:
+            thresholds = full(N, nan)      # NB the thresholds of the skipped blocks arent calculated
+            thresholds[points] = point_thresholds
+    
+    else:
+        # 1. Thresholds
+        if threshold == 'unspecified':
+            thresholds = _max_peak_thresholds(_centred_cumsum(signal, signal[0]), signal[0], window_length, vert_offset, 0, N, N)
+        else:
+            thresholds = full(N, float(threshold))
+        
+        if initial_thres != 'unspecified':
+            thresholds[0] = initial_thres
+        
+        # 2. Crossings, a positive or negetive gradient crossing of the threshold at point i (NB there cant be a crossing at i = 0)
+        crossing_index = flatnonzero(((signal[1:] >= thresholds[1:]) & (signal[:-1] <= thresholds[:-1])) | ((signal[1:] <= thresholds[1:]) & (signal[:-1] >= thresholds[:-1]))) + 1
+        ends_above = len(crossing_index) > 0 and signal[crossing_index[-1]-1] > thresholds[crossing_index[-1]-1]
+        window_starts, window_stops, outer_crossings, inner_crossings = _group_crossings(crossing_index, ends_above)
+        
+        # 3. The max local peak between each set of outer crossings
+        local_peak_values = full(N, -inf)
+        if N > 2:
+            is_local_peak = (signal[1:-1] > signal[:-2]) & (signal[2:] <= signal[1:-1]) & (signal[1:-1] >= thresholds[1:-1])
+            local_peak_values[1:-1] = where(is_local_peak, signal[1:-1], -inf)
+        
+        if len(window_starts) > 0:
+            first = window_starts[0]
+            values = local_peak_values[first:window_stops[-1]]
+            window_max = maximum.reduceat(values, window_starts - first)
+            
+            # finding where in each window its max is, NB for equal peak values the later one is used
+            is_window_max = (values == repeat(window_max, window_stops - window_starts)) & (values > -inf)
+            max_index = maximum.reduceat(where(is_window_max, arange(len(values)), -1), window_starts - first) + first
+            max_index = max_index[window_max > -inf]     # dropping windows without a local peak
+        else:
+            max_index = array([], dtype = int_)
+        
+        max_index_thresholds = thresholds[max_index]
+    
+# 4. Checking each max peak against the optional criteria, these depend on the previous positively identified peak so are done in order
+    status = zeros(len(max_index), dtype = int8)
+    previous_peak = None
+    previous_peak_value = None
+    
+    for k, (index, value, index_threshold) in enumerate(zip(max_index.tolist(), signal[max_index].tolist(), max_index_thresholds.tolist())):
+        status[k] = _max_peak_status(index, value, index_threshold, previous_peak, previous_peak_value, min_peak_distance, min_amount_from_threshold, peak_value_consistancy_fraction)
+        if status[k] == ACCEPTED:
+            previous_peak = index
+            previous_peak_value = value
+    
+    if compact:
+        return(_compact_peak_result(max_index, signal[max_index], max_index_thresholds, status, len(signal)))
+    
+    max_peak_index = max_index[status == ACCEPTED]
+    max_peak_value = array(signal[max_peak_index], dtype = float)
+    
+    return(max_peak_index, max_peak_value, thresholds, outer_crossings.astype(int_), inner_crossings.astype(int_), max_index[status != ACCEPTED].astype(int_))
+
+# Groups the crossings into the windows of max_peak_finder, [0,1,2], [2,3,4] etc, adding the end_check window if the signal ends on an
+# inner crossing and ends_above is True (ie the signal was above the threshold just before the last crossing).
+# Returns: window_starts, window_stops, outer_crossings, inner_crossings
+def _group_crossings(crossing_index, ends_above):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import array, int_, concatenate
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    number_of_windows = max(int((len(crossing_index)-1)/2), 0)
+    window_starts = crossing_index[0:2*number_of_windows:2]
+    window_stops = crossing_index[2:2*number_of_windows+1:2]
+    
+    outer_crossings = crossing_index[0:2*number_of_windows+1:2] if number_of_windows > 0 else array([], dtype = int_)
+    inner_crossings = crossing_index[1:2*number_of_windows:2]
+    
+    # END PEAK CHECKER, the signal ends on an inner crossing and was above the threshold before it. See end_check in the loop.
+    if len(crossing_index) >= 2 and len(crossing_index)%2 == 0 and ends_above:
+        window_starts = concatenate((window_starts, crossing_index[-2:-1]))
+        window_stops = concatenate((window_stops, crossing_index[-1:]))
+        inner_crossings = concatenate((inner_crossings, crossing_index[-1:]))
+        if number_of_windows == 0:
+            outer_crossings = crossing_index[0:1]
+    
+    return(window_starts, window_stops, outer_crossings, inner_crossings)
+
+# Returns the index of the max local peak in each window, given the (ascending) indices and values of the local peaks. Windows without a
+# local peak are dropped, and as in _max_peak_finder_vectorized the later index is used for equal peak values.
+def _window_max_peaks(local_peak_index, local_peak_values, window_starts, window_stops):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import array, int_, searchsorted, lexsort, maximum, append
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    if len(window_starts) == 0 or len(local_peak_index) == 0:
+        return(array([], dtype = int_))
+    
+    window = searchsorted(window_starts, local_peak_index, 'right') - 1
+    in_window = (window >= 0) & (local_peak_index < window_stops[maximum(window, 0)])
+    window = window[in_window]
+    
+    order = lexsort((local_peak_index[in_window], local_peak_values[in_window], window))      # by window, then value, then index
+    is_window_max = append(window[order][1:] != window[order][:-1], True)                     # the last of each window
+    return(local_peak_index[in_window][order][is_window_max])
+
+# COARSE TO FINE ---------------------
+
+# For very long recordings (eg days at 1 kHz) most of a signal can be well below its threshold, where max_peak_finder has nothing to
+# find. With coarse_to_fine = True the signal is first split into blocks of coarse_block_length points, and a block is skipped if its
+# max is below a lower bound of the thresholds in the block. Steps 1 to 3 of the vectorized engine are then only done at the points of
+# the remaining blocks (plus one point either side), so the thresholds, crossings and local peaks are only calculated where they can
+# matter.
+
+# NO PEAKS ARE MISSED: every point of a skipped block is strictly below its threshold, so there cant be a local peak in it, or a crossing
+# other than at its first point (which is checked, as it is next to the previous block). The crossings and local peaks found are therefore
+# all of the crossings and local peaks of the signal, and the outputs are exactly those of the vectorized engine, other than the
+# thresholds output being nan in the skipped blocks.
+
+# The lower bound of the thresholds in a block is found from the cumulative sum, as the smallest cumulative sum the end of a points
+# window can have in the block minus the largest its start can have. As the threshold is calculated with the same floating point
+# operations, and rounding never changes the order of two numbers, the bound holds exactly rather than just to within rounding. Blocks
+# with any of the first or last (window_length-1)/2 points (which use the first and last full windows) are never skipped.
+
+# The block length is a trade off, shorter blocks give a tighter bound and skip more of the signal between peaks, but take longer to
+# check. It should be around the width of the peaks, if it isnt given 32 points is used.
+
+# Returns: points (the indices the thresholds were calculated for), their thresholds, crossing_index and local_peak_index
+def _coarse_to_fine_candidates(signal, threshold, initial_thres, vert_offset, window_length, block_length = 'unspecified'):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange, ones, full, repeat, flatnonzero, maximum, minimum
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    N = len(signal)
+    if block_length == 'unspecified':
+        block_length = 32
+    block_length = int(block_length)
+    
+    # Coarse pass, finding the blocks that could hold a crossing or local peak
+    block_max = maximum.reduceat(signal, arange(0, N, block_length))
+    
+    if threshold == 'unspecified':
+        reference = signal[0]
+        cumulative_sum = _centred_cumsum(signal, reference)
+        half_window = int((window_length-1)/2)
+        
+        active = ones(len(block_max), dtype = bool)
+        first = -(-(half_window + 1)//block_length)          # the first block whose points all have centred windows
+        last = (N - half_window)//block_length               # the blocks before this have no points in the last half window
+        if last > first:
+            block_offsets = arange(0, (last - first)*block_length, block_length)
+            min_window_stop_sum = minimum.reduceat(cumulative_sum[first*block_length + half_window + 1:last*block_length + half_window + 1], block_offsets)
+            max_window_start_sum = maximum.reduceat(cumulative_sum[first*block_length - half_window:last*block_length - half_window], block_offsets)
+            active[first:last] = ~(block_max[first:last] < (min_window_stop_sum - max_window_start_sum)/window_length + reference + vert_offset)   # NB a nan is kept
+    else:
+        active = ~(block_max < float(threshold))
+    active[0] = True      # for initial_thres and the start of the signal
+    
+    # Fine pass, at the points of the kept blocks plus one point either side
+    is_active = repeat(active, block_length)[:N]
+    is_needed = is_active.copy()
+    is_needed[:-1] |= is_active[1:]
+    is_needed[1:] |= is_active[:-1]
+    points = flatnonzero(is_needed)
+    
+    if threshold == 'unspecified':
+        point_thresholds = _max_peak_thresholds_at(cumulative_sum, reference, window_length, vert_offset, points, N)
+    else:
+        point_thresholds = full(len(points), float(threshold))
+    
+    if initial_thres != 'unspecified':
+        point_thresholds[0] = initial_thres
+    
+    values = signal[points]
+    follows = points[1:] == points[:-1] + 1        # the point before is also in points
+    crossing_index = points[1:][follows & (((values[1:] >= point_thresholds[1:]) & (values[:-1] <= point_thresholds[:-1])) | ((values[1:] <= point_thresholds[1:]) & (values[:-1] >= point_thresholds[:-1])))]
+    local_peak_index = points[1:-1][follows[:-1] & follows[1:] & (values[1:-1] > values[:-2]) & (values[2:] <= values[1:-1]) & (values[1:-1] >= point_thresholds[1:-1])]
+    
+    return(points, point_thresholds, crossing_index, local_peak_index)
+
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+
+# --------------------------------------------- STREAMING PEAK DETECTORS ------------------------------------------------
+
+# These are versions of adaptive_peak_finder and max_peak_finder for live signals that arrive a chunk at a time. Rather than re-running
+# the peak finder on the whole signal every time new data arrives, a detector is created once with the same inputs as the peak finder,
+# each new chunk is passed to its push method, and push returns the peaks that have been confirmed by that chunk. Once the signal has
+# finished, close returns any peaks left at the end of the signal.
+
+# A point can only be confirmed once (window_length-1)/2 points after it have arrived (so its threshold is known) plus any points needed
+# to see the end of a flat section or crossing, so the peaks lag the live signal by about half a window. Only the points still needed
+# are stored, which is about one window length plus that lookahead. (NB a flat section must be stored until it ends, so a signal that
+# is flat for a long time will grow the store until it changes value.)
+
+# The thresholds are calculated the same way as the vectorized engines, so all the peaks returned by push and close, put together, are
+# the same as one run of the vectorized engine on the whole signal no matter how the signal was split into chunks.
+
+# EXAMPLE:
+# detector = AdaptivePeakDetector(vert_offset = 0, window_length = 201, min_peak_distance = 50)
+# for chunk in live_feed:
+#     peak_index, peak_value, ignored_peak_index, ignored_peak_value = detector.push(chunk)
+# peak_index, peak_value, ignored_peak_index, ignored_peak_value = detector.close()
+
+
+# ADAPTIVE PEAK DETECTOR ---------------------
+
+# Streaming version of adaptive_peak_finder, see adaptive_peak_finder for the inputs.
+# push and close return: peak_index, peak_value, ignored_peak_index, ignored_peak_value (indices are of the whole signal so far)
+
+class AdaptivePeakDetector:
+    
+    def __init__(self, vert_offset = 'unspecified', window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified'):
+        from numpy import zeros
+        from yes_no_input_checker import MissingInputError, EvenNumberError
+        
+        # Checking inputs
+        if vert_offset == 'unspecified':
+            vert_offset = 0     # making the threshold = moving mean
+        
+        if window_length == 'unspecified':
+            raise MissingInputError('ERROR, no window_length was provided, if you dont want to update the threshold use the basic_peak_finder function')
+        
+        if window_length%2 == 0:
+            raise EvenNumberError('ERROR, an even number was entered for the window length, the window length should be odd')
+        
+        self.vert_offset = vert_offset
+        self.window_length = window_length
+        self.half_window = int((window_length-1)/2)
+        self.min_peak_distance = min_peak_distance
+        self.min_amount_from_threshold = min_amount_from_threshold
+        
+        self.signal = zeros(0)              # the stored points of the signal, signal[0] is point buffer_start of the whole signal
+        self.cumulative_sum = zeros(1)      # cumulative_sum[k - buffer_start] is the running sum up to (not including) point k
+        self.buffer_start = 0
+        self.N = 0                          # number of points received so far
+        self.reference = None               # the first point of the signal, see _centred_cumsum
+        self.next_i = 1                     # the first point that hasnt been checked yet, NB like adaptive_peak_finder point 0 is never a peak
+        self.previous_peak = None           # the last positively identified peak, used for min_peak_distance
+        
+    def push(self, chunk):
+        from numpy import asarray, concatenate, flatnonzero
+        
+        chunk = asarray(chunk, dtype = float).ravel()
+        if len(chunk) > 0:
+            if self.reference is None:
+                self.reference = chunk[0]
+            
+            self.cumulative_sum = concatenate((self.cumulative_sum, _centred_cumsum(chunk, self.reference, self.cumulative_sum[-1])[1:]))
+            self.signal = concatenate((self.signal, chunk))
+            self.N = self.N + len(chunk)
+        
+        # A point can be checked once its threshold window is complete, and once the point after any flat section it sits on has arrived.
+        # The last flat section in the stored signal starts at the last change in value.
+        value_changes = flatnonzero(self.signal[1:] != self.signal[:-1])
+        last_flat_start = self.buffer_start + (value_changes[-1] + 1 if len(value_changes) > 0 else 0)
+        
+        peaks = self._check_points(min(self.N - self.half_window, last_flat_start))
+        
+        # Dropping points that are no longer needed, keeping the point before next_i and the threshold window of next_i
+        keep_from = max(0, self.next_i - max(self.half_window, 1))
+        self.signal = self.signal[keep_from - self.buffer_start:]
+        self.cumulative_sum = self.cumulative_sum[keep_from - self.buffer_start:]
+        self.buffer_start = keep_from
+        
+        return(peaks)
+    
+    def close(self):
+        # The signal has ended so the end of the threshold windows and the final point are known. Like adaptive_peak_finder the final
+        # point isnt checked, and a flat section running to the end of the signal isnt a peak.
+        return(self._check_points(self.N - 1))
+    
+    def _check_points(self, stop):
+        from numpy import array, full, inf, int_
+        
+        if stop <= self.next_i:
+            return(array([], dtype = int_), array([]), array([], dtype = int_), array([]))
+        
+        # Thresholds for the points being checked, every other point is given an infinite threshold so it cant be a possible peak
+        local_signal = self.signal[self.next_i - 1 - self.buffer_start:]
+        local_thresholds = full(len(local_signal), inf)
+        local_thresholds[1:stop - self.next_i + 1] = _adaptive_thresholds(self.cumulative_sum, self.reference, self.window_length, self.vert_offset, self.next_i, stop, self.N, self.buffer_start)
+        
+        local_possible_peaks = _plateau_peak_candidates(local_signal, local_thresholds)
+        possible_peaks = local_possible_peaks + self.next_i - 1
+        
+        peak_index, ignored_peak_index, self.previous_peak, _ = _select_adaptive_peaks(possible_peaks, local_signal[local_possible_peaks], local_thresholds[local_possible_peaks], self.min_peak_distance, self.min_amount_from_threshold, self.previous_peak)
+        self.next_i = stop
+        
+        return(peak_index, self.signal[peak_index - self.buffer_start], ignored_peak_index, self.signal[ignored_peak_index - self.buffer_start])
+
+
+# MAX PEAK DETECTOR ---------------------
+
+# Streaming version of max_peak_finder, see max_peak_finder for the inputs.
+# push and close return: max_peak_index, max_peak_value, ignored_peak_index (indices are of the whole signal so far)
+
+# NB as the first (window_length-1)/2 thresholds are the mean of the first full window length, nothing is returned until window_length
+# points have arrived. Similarly the last thresholds use the mean of the last full window, so they are only found by close.
+
+class MaxPeakDetector:
+    
+    def __init__(self, threshold = 'unspecified', initial_thres = 'unspecified', vert_offset = 'unspecified', window_length = 'unspecified', min_peak_distance = 'unspecified', min_amount_from_threshold = 'unspecified', peak_value_consistancy_fraction = 'unspecified'):
+        from numpy import zeros
+        from yes_no_input_checker import InvalidInputError, MissingInputError, EvenNumberError
+        
+        # Checking inputs
+        if threshold == 'unspecified':
+            if vert_offset == 'unspecified':
+                vert_offset = 0     # making the threshold = moving mean
+            
+            if window_length == 'unspecified':
+                raise MissingInputError('ERROR, no window_length was provided, if you dont want to update the threshold use a constant threshold')
+            
+            if window_length%2 == 0:
+                raise EvenNumberError('ERROR, an even number was entered for the window length, the window length should be odd')
+        
+        elif vert_offset != 'unspecified' or window_length != 'unspecified':
+            raise InvalidInputError('ERROR! Threshold has been defined as a constant, but so too has one or more of the adaptive arguments: vert_offset or window_length')
+        
+        self.threshold = threshold
+        self.initial_thres = initial_thres
+        self.vert_offset = vert_offset
+        self.window_length = window_length
+        self.half_window = int((window_length-1)/2) if threshold == 'unspecified' else 0
+        self.min_peak_distance = min_peak_distance
+        self.min_amount_from_threshold = min_amount_from_threshold
+        self.peak_value_consistancy_fraction = peak_value_consistancy_fraction
+        
+        self.signal = zeros(0)              # the stored points of the signal, signal[0] is point buffer_start of the whole signal
+        self.cumulative_sum = zeros(1)      # cumulative_sum[k - buffer_start] is the running sum up to (not including) point k
+        self.buffer_start = 0
+        self.N = 0                          # number of points received so far
+        self.reference = None               # the first point of the signal, see _centred_cumsum
+        self.next_i = 0                     # the first point that hasnt been checked yet
+        self.previous_signal = None         # the signal value and threshold of point next_i-1, needed to check for a crossing at next_i
+        self.previous_threshold = None
+        
+        # The crossing state, this plays the role of crossing_index and j in max_peak_finder. Rather than storing the signal between the
+        # outer crossings, the largest local peak seen so far before and after the inner crossing is stored as (value, index, threshold)
+        self.j = 0
+        self.inner_crossing_above_threshold = False     # whether the point before the inner crossing was above its threshold, see end_check in max_peak_finder
+        self.max_before_inner = None
+        self.max_after_inner = None
+        
+        self.previous_peak = None           # the last positively identified max peak and its value
+        self.previous_peak_value = None
+        
+    def push(self, chunk):
+        from numpy import asarray, concatenate
+        
+        chunk = asarray(chunk, dtype = float).ravel()
+        if len(chunk) > 0:
+            if self.reference is None:
+                self.reference = chunk[0]
+            
+            if self.threshold == 'unspecified':
+                self.cumulative_sum = concatenate((self.cumulative_sum, _centred_cumsum(chunk, self.reference, self.cumulative_sum[-1])[1:]))
+            self.signal = concatenate((self.signal, chunk))
+            self.N = self.N + len(chunk)
+        
+        # A point can be checked once its threshold is known and the point after it has arrived. With an adaptive threshold the first
+        # thresholds need the first full window.
+        if self.threshold == 'unspecified' and self.N < self.window_length:
+            peaks = self._check_points(0, self.N)
+        else:
+            peaks = self._check_points(self.N - max(self.half_window, 1), self.N)
+        
+        # Dropping points that are no longer needed, keeping the threshold window of next_i, the point before it and the last full
+        # window, which is needed for the final thresholds.
+        if self.threshold == 'unspecified':
+            keep_from = max(0, min(self.next_i - max(self.half_window, 1), self.N - self.window_length))
+        else:
+            keep_from = max(0, self.next_i - 1)
+        self.signal = self.signal[keep_from - self.buffer_start:]
+        if self.threshold == 'unspecified':
+            self.cumulative_sum = self.cumulative_sum[keep_from - self.buffer_start:]
+        self.buffer_start = keep_from
+        
+        return(peaks)
+    
+    def close(self):
+        from numpy import concatenate
+        
+        max_peak_index, max_peak_value, ignored_peak_index = self._check_points(self.N, self.N)
+        
+        # END PEAK CHECKER, see end_check in max_peak_finder
+        if self.j == 2 and self.inner_crossing_above_threshold:
+            kept, ignored = self._close_crossings(self.max_before_inner)
+            max_peak_index = concatenate((max_peak_index, kept[0]))
+            max_peak_value = concatenate((max_peak_value, kept[1]))
+            ignored_peak_index = concatenate((ignored_peak_index, ignored))
+        
+        return(max_peak_index, max_peak_value, ignored_peak_index)
+    
+    def _close_crossings(self, max_peak):
+        # Applies the max_peak_finder peak criteria to the max peak found between a set of outer crossings
+        from numpy import array, int_
+        
+        if max_peak is None:    # no local peak was found between the crossings
+            return((array([], dtype = int_), array([])), array([], dtype = int_))
+        
+        value, index, threshold = max_peak
+        if _max_peak_status(index, value, threshold, self.previous_peak, self.previous_peak_value, self.min_peak_distance, self.min_amount_from_threshold, self.peak_value_consistancy_fraction) == ACCEPTED:
+            self.previous_peak = index
+            self.previous_peak_value = value
+            return((array([index], dtype = int_), array([value])), array([], dtype = int_))
+        
+        return((array([], dtype = int_), array([])), array([index], dtype = int_))
+    
+    def _check_points(self, stop, N):
+        from numpy import array, concatenate, flatnonzero, full, inf, int_, where, arange
+        
+        if stop <= self.next_i:
+            return(array([], dtype = int_), array([]), array([], dtype = int_))
+        
+        start = self.next_i
+        i = arange(start, stop)
+        local_signal = self.signal[start - self.buffer_start: stop - self.buffer_start]
+        
+        # Calculating the thresholds
+        if self.threshold == 'unspecified':
+            thresholds = _max_peak_thresholds(self.cumulative_sum, self.reference, self.window_length, self.vert_offset, start, stop, N, self.buffer_start)
+        else:
+            thresholds = full(stop - start, float(self.threshold))
+        if start == 0 and self.initial_thres != 'unspecified':
+            thresholds[0] = self.initial_thres
+        
+        # The previous and next point of every point being checked, NB point 0 has no previous point and the final point no next point
+        if start == 0:
+            previous_signal = concatenate(([inf], local_signal[:-1]))
+            previous_thresholds = concatenate(([inf], thresholds[:-1]))
+        else:
+            previous_signal = concatenate(([self.previous_signal], local_signal[:-1]))
+            previous_thresholds = concatenate(([self.previous_threshold], thresholds[:-1]))
+        next_signal = self.signal[start + 1 - self.buffer_start: stop + 1 - self.buffer_start]
+        if len(next_signal) < len(local_signal):
+            next_signal = concatenate((next_signal, [inf]))
+        
+        # checking for positive or negetive gradient crossings of the threshold, see max_peak_finder
+        crossings = ((local_signal >= thresholds) & (previous_signal <= previous_thresholds)) | ((local_signal <= thresholds) & (previous_signal >= previous_thresholds))
+        crossings[i == 0] = False
+        
+        # The local peaks, the max peak between a set of crossings is the largest of these
+        local_peaks = (i != 0) & (i != N-1) & (previous_signal < local_signal) & (next_signal <= local_signal) & (local_signal >= thresholds)
+        local_peak_values = where(local_peaks, local_signal, -inf)
+        
+        max_peak_index = []
+        max_peak_value = []
+        ignored_peak_index = []
+        
+        cursor = 0
+        for crossing in flatnonzero(crossings).tolist() + [len(local_signal)]:
+            
+            # Finding the largest local peak between the previous crossing and this one, NB for equal peak values the later one is used
+            if crossing > cursor and self.j > 0:
+                values = local_peak_values[cursor:crossing]
+                largest = len(values) - 1 - values[::-1].argmax()
+                if values[largest] > -inf:
+                    new_max = (values[largest], start + cursor + largest, thresholds[cursor + largest])
+                    if self.j == 1 and (self.max_before_inner is None or new_max[0] >= self.max_before_inner[0]):
+                        self.max_before_inner = new_max
+                    elif self.j == 2 and (self.max_after_inner is None or new_max[0] >= self.max_after_inner[0]):
+                        self.max_after_inner = new_max
+            
+            if crossing == len(local_signal):
+                break
+            
+            self.j = self.j + 1
+            if self.j == 2:
+                if crossing > 0:
+                    self.inner_crossing_above_threshold = local_signal[crossing-1] > thresholds[crossing-1]
+                else:
+                    self.inner_crossing_above_threshold = self.previous_signal > self.previous_threshold
+            
+            elif self.j == 3:
+                # Once 3 crossings have occured the max peak between the outer crossings is the larger of the max before and after the inner crossing
+                max_peak = self.max_before_inner
+                if self.max_after_inner is not None and (max_peak is None or self.max_after_inner[0] >= max_peak[0]):
+                    max_peak = self.max_after_inner
+                
+                kept, ignored = self._close_crossings(max_peak)
+                max_peak_index.append(kept[0])
+                max_peak_value.append(kept[1])
+                ignored_peak_index.append(ignored)
+                
+                # The final crossing now becomes the first crossing
+                self.j = 1
+                self.max_before_inner = None
+                self.max_after_inner = None
+            
+            cursor = crossing
+        
+        self.previous_signal = local_signal[-1]
+        self.previous_threshold = thresholds[-1]
+        self.next_i = stop
+        
+        return(concatenate([array([], dtype = int_)] + max_peak_index), concatenate([array([])] + max_peak_value), concatenate([array([], dtype = int_)] + ignored_peak_index))
+
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+
+# --------------------------------------------- BATCH MAX PEAK FINDER ---------------------------------------------------
+
+# Runs max_peak_finder on many signals at once, spreading the signals across a pool of processes so each CPU core works on a different
+# signal. Rather than pickling every signal and sending it to the processes, all the signals are copied once into a block of shared
+# memory which every process reads from directly. The signals are handed out longest first so the cores finish at about the same time.
+
+# INPUTS ---------------------
+
+# signals: either a 2-D array where each row is a signal (channel), or a dictionary whose values are signal arrays. The dictionary
+#          can be nested, eg pig['sepsis']['3']['control']['Q_ao_filtered'], in which case every array in it is a signal.
+# max_workers: the number of processes to use, if unspecified one process per CPU core is used
+# max_peak_finder_inputs: any of the max_peak_finder inputs, eg window_length = 201, these are used for every signal. NB interactive is
+#                         always False, so an invalid input raises an exception rather than asking for it to be re-entered.
+
+# OUTPUTS --------------------
+# results: the max_peak_finder outputs (max_peak_index, max_peak_value, thresholds, outer_crossings, inner_crossings, ignored_peak_index)
+#          of each signal. For a 2-D array this is a list with one output per row, for a dictionary it is a dictionary with the same
+#          (nested) keys as signals.
+
+# NB the signals are stored as floats in the shared memory, so integer signals are converted to floats before finding their peaks.
+
+# EXAMPLE:
+# results = batch_max_peak_finder(pig, window_length = 201, min_peak_distance = 50)
+# max_peak_index = results['sepsis']['3']['control']['Q_ao_filtered'][0]
+
+def batch_max_peak_finder(signals, max_workers = 'unspecified', **max_peak_finder_inputs):
+    
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import ndarray, asarray, cumsum, concatenate
+    from multiprocessing import shared_memory
+    from concurrent.futures import ProcessPoolExecutor
+    from yes_no_input_checker import MissingInputError, EvenNumberError
+    
+    # -------------------------------------------------------------------------------------------------------------    
+    
+    # The processes have no one to ask to re-enter an invalid input, so max_peak_finder raises an exception instead
+    max_peak_finder_inputs['interactive'] = False
+    
+    # Checking inputs, this is done here as an error inside a process would only be seen once every process has started
+    if max_peak_finder_inputs.get('threshold', 'unspecified') == 'unspecified':
+        if max_peak_finder_inputs.get('window_length', 'unspecified') == 'unspecified':
+            raise MissingInputError('ERROR, no window_length was provided, if you dont want to update the threshold use a constant threshold')
+        if max_peak_finder_inputs['window_length']%2 == 0:
+            raise EvenNumberError('ERROR, an even number was entered for the window length, the window length should be odd')
+    
+    # Making a list of every signal along with the key(s) needed to store its result
+    channels = []
+    if isinstance(signals, dict):
+        _collect_dict_signals(signals, (), channels)
+    elif isinstance(signals, ndarray) and signals.ndim == 2:
+        channels = [((row,), signals[row]) for row in range(signals.shape[0])]
+    else:
+        raise Exception('ERROR, signals must be either a 2-D array with a signal in each row, or a dictionary of signal arrays')
+    
+    lengths = [len(signal) for _, signal in channels]
+    offsets = concatenate(([0], cumsum(lengths))).astype(int)
+    
+    results = [None]*len(channels)
+    
+    if max_workers == 1 or len(channels) <= 1:
+        # Not worth starting any processes
+        for channel_number, (_, signal) in enumerate(channels):
+            results[channel_number] = max_peak_finder(asarray(signal, dtype = float), **max_peak_finder_inputs)
+    
+    else:
+        # Copying every signal into one block of shared memory
+        shared_block = shared_memory.SharedMemory(create = True, size = max(int(offsets[-1])*8, 8))
+        try:
+            shared_signals = ndarray((offsets[-1],), dtype = float, buffer = shared_block.buf)
+            for channel_number, (_, signal) in enumerate(channels):
+                shared_signals[offsets[channel_number]:offsets[channel_number+1]] = signal
+            del shared_signals      # the shared memory cant be closed while an array is still using it
+            
+            with ProcessPoolExecutor(max_workers = None if max_workers == 'unspecified' else max_workers, initializer = _batch_worker_initializer, initargs = (shared_block.name, int(offsets[-1]))) as executor:
+                longest_first = sorted(range(len(channels)), key = lambda channel_number: lengths[channel_number], reverse = True)
+                futures = [(channel_number, executor.submit(_batch_worker, int(offsets[channel_number]), int(offsets[channel_number+1]), max_peak_finder_inputs)) for channel_number in longest_first]
+                for channel_number, future in futures:
+                    results[channel_number] = future.result()
+        
+        finally:
+            shared_block.close()
+            shared_block.unlink()
+    
+    # Putting the results back into the same layout as signals
+    if isinstance(signals, dict):
+        dict_results = {}
+        for (key_path, _), result in zip(channels, results):
+            level = dict_results
+            for key in key_path[:-1]:
+                level = level.setdefault(key, {})
+            level[key_path[-1]] = result
+        return(dict_results)
+    
+    return(results)
+
+# Adds every signal array in a (nested) dictionary to channels along with the keys that lead to it
+def _collect_dict_signals(signals, key_path, channels):
+    from numpy import ndarray
+    
+    for key, value in signals.items():
+        if isinstance(value, dict):
+            _collect_dict_signals(value, key_path + (key,), channels)
+        elif isinstance(value, ndarray) and value.ndim == 1:
+            channels.append((key_path + (key,), value))
+        else:
+            raise Exception('ERROR, the value at ' + str(key_path + (key,)) + ' is not a 1-D signal array or a dictionary of them')
+
+# Each process in the pool attaches to the shared memory once, when it starts, and keeps it in these globals
+_batch_shared_block = None
+_batch_shared_signals = None
+
+def _batch_worker_initializer(shared_block_name, total_length):
+    from numpy import ndarray
+    from multiprocessing import shared_memory
+    global _batch_shared_block, _batch_shared_signals
+    
+    _batch_shared_block = shared_memory.SharedMemory(name = shared_block_name)
+    _batch_shared_signals = ndarray((total_length,), dtype = float, buffer = _batch_shared_block.buf)
+
+def _batch_worker(start, stop, max_peak_finder_inputs):
+    return(max_peak_finder(_batch_shared_signals[start:stop], **max_peak_finder_inputs))
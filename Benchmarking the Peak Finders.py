@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+# _________________________________________________ BENCHMARKING THE PEAK FINDERS ____________________________________________
+
+# Times basic_peak_finder, adaptive_peak_finder and max_peak_finder (with and without coarse_to_fine) from Adaptive_Find_Peaks.py on
+# synthetic ECG like and noisy sinusoid signals of 1e3 to 1e7 samples, with several window lengths, and reports the time, the peak RSS
+# (memory) and the peaks found per second of each case. The results can be saved as a JSON baseline, and later runs are compared against it, with any case that
+# is slower (or uses more memory) than the baseline by more than the tolerance flagged as a regression.
+
+# Each case is run in its own fresh process, so the peak RSS of one case isnt hidden by a larger case run before it. The time is the
+# best of the repeats, and the peak RSS is how much the processes max resident set size grew while running the peak finder (the
+# signal and imports are already in memory before it is measured). NB peak RSS needs the resource module, which windows doesnt have,
+# so it is reported as None there.
+
+# Run from the command line, eg
+#     python "Benchmarking the Peak Finders.py" --save-baseline          (first run, stores the baseline)
+#     python "Benchmarking the Peak Finders.py"                          (later runs, compares against the baseline)
+#     python "Benchmarking the Peak Finders.py" --max-size 1e5           (quicker run with only the smaller signals)
+# The exit status is 1 if any regression was flagged, so it can be used in a script.
+
+# --- IMPORTING MODULES ________________________________________
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import multiprocessing
+
+# --- IMPORTING FUNCTIONS ______________________________________
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# --- SETTINGS _________________________________________________
+SIZES = [1000, 10000, 100000, 1000000, 10000000]
+WINDOW_LENGTHS = [51, 501, 5001]
+SIGNAL_KINDS = ['ecg', 'sinusoid']
+FINDERS = ['basic', 'adaptive', 'max', 'max_coarse']      # max_coarse is max_peak_finder with coarse_to_fine = True
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'peak_finder_benchmark_baseline.json')
+
+# ---------------------------------------------- SYNTHETIC SIGNALS ------------------------------------------------------
+
+# ECG LIKE SIGNAL ---------------------
+# A train of heart beats, each made of gaussian P, Q, R, S and T waves, with a slowly varying heart rate, baseline wander and noise.
+# Sampled at 500 Hz, so 1e7 samples is about 5.5 hours of ECG.
+def ecg_like_signal(N, seed = 0):
+
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange, cumsum, sin, pi, exp, zeros
+    from numpy.random import default_rng
+
+    # -------------------------------------------------------------------------------------------------------------
+
+    rng = default_rng(seed)
+    fs = 500.0
+    t = arange(N)/fs
+
+    heart_rate = 72 + 8*sin(2*pi*0.01*t)                # beats per minute
+    beat_phase = cumsum(heart_rate/60/fs) % 1           # 0 to 1 through each beat
+
+    signal = zeros(N)
+    for centre, width, height in ((0.15, 0.025, 0.15), (0.27, 0.008, -0.12), (0.30, 0.010, 1.0), (0.33, 0.008, -0.25), (0.55, 0.040, 0.3)):    # P, Q, R, S, T
+        signal += height*exp(-0.5*((beat_phase - centre)/width)**2)
+
+    signal += 0.1*sin(2*pi*0.3*t)                      # baseline wander (breathing)
+    signal += rng.normal(0, 0.03, N)
+    return(signal)
+
+# NOISY SINUSOID ---------------------
+# A sinusoid with a period of 250 samples plus gaussian noise, the noise gives lots of small local peaks for the finders to sift through.
+def noisy_sinusoid(N, seed = 0):
+
+    # -------------------------------------------  IMPORTED MODULES -----------------------------------------------
+    from numpy import arange, sin, pi
+    from numpy.random import default_rng
+
+    # -------------------------------------------------------------------------------------------------------------
+
+    rng = default_rng(seed)
+    return(sin(2*pi*arange(N)/250) + rng.normal(0, 0.2, N))
+
+# ---------------------------------------------- BENCHMARK CASES ------------------------------------------------------
+
+# Returns the list of cases to run, a case is a dictionary of the finder, signal kind, size and window length (None for basic_peak_finder
+# which doesnt use one). Window lengths as long or longer than the signal are skipped.
+def benchmark_cases(sizes = SIZES, window_lengths = WINDOW_LENGTHS, signal_kinds = SIGNAL_KINDS, finders = FINDERS):
+    cases = []
+    for signal_kind in signal_kinds:
+        for N in sizes:
+            for finder in finders:
+                if finder == 'basic':
+                    cases.append({'finder': finder, 'signal': signal_kind, 'N': int(N), 'window_length': None})
+                    continue
+                for window_length in window_lengths:
+                    if window_length < N:
+                        cases.append({'finder': finder, 'signal': signal_kind, 'N': int(N), 'window_length': int(window_length)})
+    return(cases)
+
+# The key a case is stored under in the baseline
+def case_key(case):
+    return(case['finder'] + '/' + case['signal'] + '/N=' + str(case['N']) + '/w=' + str(case['window_length']))
+
+# Returns a function that runs the cases peak finder on a signal, and returns the number of peaks found
+def _case_runner(case):
+    from Adaptive_Find_Peaks import basic_peak_finder, adaptive_peak_finder, max_peak_finder
+
+    window_length = case['window_length']
+    if case['finder'] == 'basic':
+        return(lambda signal: len(basic_peak_finder(signal)[0]))
+    if case['finder'] == 'adaptive':
+        return(lambda signal: len(adaptive_peak_finder(signal, vert_offset = 0.1, window_length = window_length, min_peak_distance = 100, interactive = False)[0]))
+    if case['finder'] == 'max_coarse':
+        return(lambda signal: len(max_peak_finder(signal, vert_offset = 0.1, window_length = window_length, min_peak_distance = 100, interactive = False, coarse_to_fine = True)[0]))
+    return(lambda signal: len(max_peak_finder(signal, vert_offset = 0.1, window_length = window_length, min_peak_distance = 100, interactive = False)[0]))
+
+# Peak RSS of this process in bytes, None if it cant be measured (windows)
+def _max_rss():
+    try:
+        import resource
+    except ImportError:
+        return(None)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return(max_rss if sys.platform == 'darwin' else max_rss*1024)       # kilobytes on linux, bytes on mac
+
+# Runs a single case, this is run in its own process (see run_benchmarks)
+def _run_case(case, repeats):
+    signal = (ecg_like_signal if case['signal'] == 'ecg' else noisy_sinusoid)(case['N'])
+    runner = _case_runner(case)
+    runner(signal[:min(case['N'], 10000)])     # warm up, so the imports inside the finders arent counted in the time or memory
+
+    rss_before = _max_rss()
+    best_time = float('inf')
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        n_peaks = runner(signal)
+        best_time = min(best_time, time.perf_counter() - start)
+    rss_after = _max_rss()
+
+    return({'time': best_time,
+            'peak_rss': None if rss_before is None else rss_after - rss_before,
+            'peaks': n_peaks,
+            'peaks_per_sec': n_peaks/best_time if best_time > 0 else float('inf')})
+
+# ---------------------------------------------- RUNNING AND COMPARING ------------------------------------------------------
+
+# RUN BENCHMARKS ---------------------
+# Runs every case, each in a fresh process, printing the results as it goes. Returns a dictionary of the results keyed by case_key.
+# repeats: the number of times each case is timed, the best time is kept
+def run_benchmarks(cases, repeats = 3):
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    print('%-40s %10s %12s %8s %14s' % ('case', 'time (s)', 'peak RSS (MB)', 'peaks', 'peaks/sec'))
+    for case in cases:
+        with context.Pool(1, maxtasksperchild = 1) as pool:
+            result = pool.apply(_run_case, (case, repeats))
+        results[case_key(case)] = result
+        print('%-40s %10.4f %12s %8d %14.0f' % (case_key(case), result['time'], 'n/a' if result['peak_rss'] is None else '%.1f' % (result['peak_rss']/2**20), result['peaks'], result['peaks_per_sec']))
+    return(results)
+
+# COMPARE TO BASELINE ---------------------
+# Returns a list of regression messages, one for each case whose time (or peak RSS) is more than (1 + tolerance) times its baseline.
+# Cases missing from the baseline are skipped. Time differences of less than time_floor seconds and peak RSS growth of less than 1 MB are
+# ignored, as they are below the noise of the measurement (a case taking under a millisecond can easily time 50% slower from timer noise alone).
+def compare_to_baseline(results, baseline, tolerance = 0.25, time_floor = 0.01):
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        if result['time'] - base['time'] > time_floor and result['time'] > (1 + tolerance)*base['time']:
+            regressions.append('%s: time %.4f s vs baseline %.4f s (%+.0f%%)' % (key, result['time'], base['time'], 100*(result['time']/base['time'] - 1)))
+        if result['peak_rss'] is not None and base.get('peak_rss') is not None and result['peak_rss'] - base['peak_rss'] > 2**20 and result['peak_rss'] > (1 + tolerance)*base['peak_rss']:
+            regressions.append('%s: peak RSS %.1f MB vs baseline %.1f MB' % (key, result['peak_rss']/2**20, base['peak_rss']/2**20))
+        if result['peaks'] != base['peaks']:
+            regressions.append('%s: found %d peaks vs %d in the baseline' % (key, result['peaks'], base['peaks']))
+    return(regressions)
+
+# --- RUN SPACE ________________________________________________
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Benchmark the peak finders in Adaptive_Find_Peaks.py')
+    parser.add_argument('--baseline', default = DEFAULT_BASELINE, help = 'JSON baseline file to compare against (or save to)')
+    parser.add_argument('--save-baseline', action = 'store_true', help = 'save the results as the new baseline')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'fraction slower than the baseline that is flagged (default 0.25)')
+    parser.add_argument('--repeats', type = int, default = 3, help = 'number of times each case is timed, the best time is kept (default 3)')
+    parser.add_argument('--time-floor', type = float, default = 0.01, help = 'time differences below this many seconds are ignored (default 0.01)')
+    parser.add_argument('--max-size', type = float, default = max(SIZES), help = 'largest signal size to run, eg 1e5 for a quick run')
+    parser.add_argument('--windows', type = int, nargs = '+', default = WINDOW_LENGTHS, help = 'window lengths to run (odd)')
+    parser.add_argument('--finders', nargs = '+', default = FINDERS, choices = FINDERS)
+    arguments = parser.parse_args()
+
+    cases = benchmark_cases([N for N in SIZES if N <= arguments.max_size], arguments.windows, SIGNAL_KINDS, arguments.finders)
+    results = run_benchmarks(cases, arguments.repeats)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as baseline_file:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(), 'results': results}, baseline_file, indent = 1)
+        print('\nBaseline saved to ' + arguments.baseline)
+        sys.exit(0)
+
+    if not os.path.exists(arguments.baseline):
+        print('\nNo baseline at ' + arguments.baseline + ', run with --save-baseline to create one.')
+        sys.exit(0)
+
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('machine') != platform.platform():
+        print('\nNB the baseline was recorded on ' + str(baseline.get('machine')) + ', times may not be comparable.')
+
+    regressions = compare_to_baseline(results, baseline['results'], arguments.tolerance, arguments.time_floor)
+    if regressions:
+        print('\nREGRESSIONS (tolerance %.0f%%):' % (100*arguments.tolerance))
+        for regression in regressions:
+            print('    ' + regression)
+        sys.exit(1)
+    print('\nNo regressions against the baseline (tolerance %.0f%%).' % (100*arguments.tolerance))
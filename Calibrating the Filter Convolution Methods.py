@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# _________________________________________________ CALIBRATING THE FILTER CONVOLUTION METHODS ____________________________________________
+
+# hamming_low_pass_filter (in Filters.py) with applied_domain = 'auto' picks whichever of its three ways of applying the filter is
+# quickest for the signal length N and filter length Nf:
+#     'time': direct convolution (scipy.signal.lfilter), O(N*Nf), quickest for short filters
+#     'frequency': one fft of the whole signal (scipy.signal.fftconvolve), O(N*log(N))
+#     'overlap-add': ffts of blocks of the signal about the size of the filter (scipy.signal.oaconvolve), O(N*log(Nf)), quickest for long
+#                    signals with filters that arent short
+# Where one becomes quicker than another (the crossover points) depends on the computer, so this micro-benchmark times all three over a
+# grid of N and Nf and saves the times to filter_convolution_calibration.json next to Filters.py, which 'auto' then interpolates between.
+# NB the filter_convolution_calibration.json shipped with Filters.py holds the times of a single run on one linux x86-64 machine (its "machine"
+# entry is that machines platform string), so it only gives a rough idea of the crossover points on other computers. Re-run this script on the
+# host the filters will run on to calibrate 'auto' for it:
+#     python "Calibrating the Filter Convolution Methods.py"
+# It takes under a minute. The table printed at the end shows the quickest method for each N and Nf.
+
+# --- IMPORTING MODULES ________________________________________
+import sys
+import os
+import json
+import time
+import platform
+
+# --- IMPORTING FUNCTIONS ______________________________________
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# --- SETTINGS _________________________________________________
+SIGNAL_LENGTHS = [1000, 10000, 100000, 1000000]
+FILTER_LENGTHS = [9, 29, 101, 301, 1001, 3001, 10001]
+METHODS = ['time', 'frequency', 'overlap-add']
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filter_convolution_calibration.json')
+
+# Best time of up to repeats runs of function, stopping early once a second has been spent on it
+def best_time(function, repeats = 5):
+    best = float('inf')
+    total = 0
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        function()
+        run_time = time.perf_counter() - start
+        best = min(best, run_time)
+        total += run_time
+        if total > 1:
+            break
+    return(best)
+
+# Times each method for every signal and filter length, returns a dictionary of method: 2-D list of times [signal length][filter length]
+def time_convolution_methods(signal_lengths = SIGNAL_LENGTHS, filter_lengths = FILTER_LENGTHS):
+    import numpy
+    from scipy.signal import lfilter, fftconvolve, oaconvolve
+
+    rng = numpy.random.default_rng(0)
+    methods = {'time': lambda signal, h: lfilter(h, 1.0, signal),
+               'frequency': lambda signal, h: fftconvolve(signal, h)[:len(signal)],
+               'overlap-add': lambda signal, h: oaconvolve(signal, h)[:len(signal)]}
+
+    times = {method: [] for method in METHODS}
+    for N in signal_lengths:
+        signal = rng.normal(size = N)
+        for method in METHODS:
+            times[method].append([])
+        for Nf in filter_lengths:
+            h = rng.normal(size = Nf)
+            for method in METHODS:
+                times[method][-1].append(float('%.4g' % best_time(lambda: methods[method](signal, h))))
+    return(times)
+
+# --- RUN SPACE ________________________________________________
+
+if __name__ == '__main__':
+    times = time_convolution_methods()
+
+    with open(CALIBRATION_FILE, 'w') as calibration_file:
+        json.dump({'machine': platform.platform(), 'python': platform.python_version(), 'signal_lengths': SIGNAL_LENGTHS,
+                   'filter_lengths': FILTER_LENGTHS, 'times': times}, calibration_file, indent = 1)
+    print('Calibration saved to ' + CALIBRATION_FILE + '\n')
+
+    # Printing the quickest method for each signal and filter length
+    print('%10s' % 'N \\ Nf' + ''.join('%13d' % Nf for Nf in FILTER_LENGTHS))
+    for i, N in enumerate(SIGNAL_LENGTHS):
+        print('%10d' % N + ''.join('%13s' % min(METHODS, key = lambda method: times[method][i][j]) for j in range(len(FILTER_LENGTHS))))
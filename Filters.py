@@ -15,7 +15,25 @@ signal: is the time domain signal you want to filter once the filter is created.
 dt: is the step size between successive samples in the time domain for the signal IN SECONDS, so df is calculated in Hz in the function.
 time_shift_removed: is a yes 'y', no 'n' input which the user enter to indicate whether they want the output filtered signal to have been corrected so it has zero time shift
 applied_domain: is a string which dictates which domain the filter is applied, either in the 'time' domain using convolution or in the 'frequency' domain taking advantage of 
-                fft, ifft and multiplication.
+                fft, ifft and multiplication. The 'time' domain is a causal direct form convolution (scipy.signal.lfilter), it is O(N*Nf) so it is best for
+                short filters, while 'frequency' is O(N*log(N)). 'overlap-add' applies the filter in the frequency domain a block of the signal at a time
+                (scipy.signal.oaconvolve), which is quickest for long signals with longer filters. 'auto' picks the quickest of the three for N and Nf, see
+                CHOOSING THE CONVOLUTION METHOD below. All of them give the same filtered signal (to rounding).
+interactive: if time_shift_removed isnt 'y' or 'n', True asks the user to re-enter it and False raises a YesNoInputError. By default the user is only asked if
+             stdin is a terminal, see yes_no_input_checker.py
+axis: signal can also be a 2-D (or more) array of several signals, eg (channels, samples), in which case axis is the axis the samples are along (the last
+      by default). Every signal is filtered by the same filter, designed once, in a single batched convolution, and filtered_signal has the same shape
+      as signal (less the samples_shift points along axis if time_shift_removed is 'y').
+attenuation: optionally, the stopband attenuation in dB (eg 40) the filter needs. By default the filter length comes from the transition width alone, which
+             gives the hamming windows attenuation of about 53 dB. If less is needed the shortest filter that meets it is used instead, which is quicker
+             to apply, see hamming_filter_response below. Asking for more than the hamming window can give raises an InvalidInputError.
+dtype: the floating point type the signal is filtered in and filtered_signal is returned as, float64 by default (or outs dtype if out is given).
+       float32 halves the memory used and is quicker in the 'frequency' and 'overlap-add' domains. Its 24 bit mantissa gives about 7 significant
+       figures, and the rounding errors of the convolution (or fft) add up to about 1e-7 to 5e-7 of the largest value of the filtered signal,
+       which is below the resolution of most sensors (a 16 bit ADC resolves 1 part in 65536). h, w and trunc_sinc are still float64.
+out: optionally, an array of the shape of filtered_signal the filtered signal is written into (and returned as) rather than a new array, eg a slice
+     of a memory mapped file. The signal is then filtered a block at a time straight into out, so the working memory stays the size of a block
+     (about 32 MB) rather than of the signal.
 
 OUTPUTS:
 filtered_signal is the filtered signal
@@ -37,7 +55,7 @@ filtered_signal is the filtered signal
     For more detail, see "Smith - 2013 - Digital Signal Processing A Practical Guide for Engineers and Scientists A Practical Guide for Engineers and Scientists"
     pages 119-121. But note in there example they need to trim the end of there signal, which we dont here. I have the book in Mendeley.
     
-h is the filter impulse responce in the time domain
+h is the filter impulse responce in the time domain. NB h, w and trunc_sinc are shared with the design cache (see below) and are read only
 Nf is the filter length ie the number of filter coefficients
 freq_spec_filt is an array of the discrete frequencies for which filter coefficients exist, making up the filter frequency spectrum (useful for plotting)
 t_array_filt is an array of the discrete times for which filter impulse responce is known. (useful for plotting)
@@ -48,92 +66,435 @@ trunc_sinc is our truncated sinc function aka our truncated ideal filter responc
 
 """
 
-def hamming_low_pass_filter(fc, transition_width, signal, dt, time_shift_removed = 'n', applied_domain = 'unspecified'):
+from functools import lru_cache
+
+""" --- HAMMING FILTER DESIGN -------------------------------------------
+
+Designs the hamming windowed sinc filters used by hamming_low_pass_filter (and the high pass, band pass and band stop filters), with every coefficient
+calculated at once using numpy rather than one at a time in a for loop.
+
+The other filter types are made from low pass filters of the same length by spectral inversion, see Smith - 2013 - Digital Signal Processing A Practical
+Guide for Engineers and Scientists, chapter 14:
+    'high-pass': a delta (an all pass filter) minus the low pass filter at fc
+    'band-pass': the low pass filter at the upper cutoff minus the low pass filter at the lower cutoff
+    'band-stop': a delta minus the band pass filter
+
+The filter length Nf is worked out from the transition width (Nf = 3.3/tw_norm, the width of the hamming windows main lobe), which gives the hamming
+windows stopband attenuation of about 53 dB at the edge of the transition band. If a lower attenuation is all that is needed, attenuation can be given
+instead and the shortest filter that meets it over the same transition band is used, see FILTER FREQUENCY RESPONSE below.
+
+A design only depends on the normalized frequencies (fc/fs and transition_width/fs), so the designed filters are kept in a least recently used cache
+of the last DESIGN_CACHE_SIZE designs. Filtering many channels (or calling the filter thousands of times) with the same fc, transition_width and dt
+then only designs the filter once. The cached arrays are shared between calls, so they are made read only, copy them before changing them.
+_hamming_filter_design.cache_info() shows the hits and misses, and cache_clear() empties it.
+
+INPUTS:
+filter_type: 'low-pass', 'high-pass', 'band-pass' or 'band-stop'
+fc_norms: a tuple of the normalized cutoff frequencies, (fc/fs,) for low and high pass, or (fc_low/fs, fc_high/fs) for band pass and band stop
+tw_norm: the normalized transition width, transition_width/fs
+attenuation: optionally, the stopband attenuation (in dB, eg 40) the filter needs, see above
+
+OUTPUTS:
+h: the normalized filter impulse responce
+Nf: the filter length
+w: the hamming window
+trunc_sinc: the truncated ideal filter impulse responce. For the other filter types it is made the same way as h from the low pass truncated sincs
+            (with the delta scaled by pi to match their scale, sin(2*pi*fc_norm*m)/m rather than the normalized sinc)
+"""
+
+DESIGN_CACHE_SIZE = 64
+FILTER_TYPES = ['low-pass', 'high-pass', 'band-pass', 'band-stop']
+
+@lru_cache(maxsize = DESIGN_CACHE_SIZE)
+def _hamming_filter_design(filter_type, fc_norms, tw_norm, attenuation = 'unspecified'):
+    
+    if attenuation == 'unspecified':
+        Nf = _hamming_filter_length(tw_norm)
+    else:
+        Nf = _shortest_hamming_filter_length(filter_type, fc_norms, tw_norm, attenuation)
+    
+    h, w, trunc_sinc = _hamming_filter_kernel(filter_type, fc_norms, Nf)
+    for array in (h, w, trunc_sinc):
+        array.flags.writeable = False
+    return(h, Nf, w, trunc_sinc)
+
+# The filter length for a transition width, see HAMMING FILTER DESIGN
+def _hamming_filter_length(tw_norm):
     
     # Importing necessary modules
     import numpy
-    from scipy.signal import fftconvolve    
     
-    # Generating the low pass filter impulse responce_____________
-        
-    fs = 1/dt                           # sampling frequency of the input signal
-    N = len(signal)                     # number of points in signal
-    fc_norm = fc/fs                     # normalized cutoff frequency
-    tw_norm = transition_width/fs       # normalized transition width
     Nf = int(numpy.ceil(3.3/tw_norm))   # working out the number of filter coefficients (filter length) required for the hamming window.
     if Nf%2 == 0:
         Nf = Nf+1       # if Nf is worked out to be even, we add one to make it odd. This isnt always necessary, but
                         # even and odd filter impulse responces are slightly different and the odd type is more versatile
                         # see Ifeachor Emmanuel, Jervis Barrie - 1993 - Digital Signal Processing Chpt on FIR filter design. (pg 284 in 1st Edition)
+    return(Nf)
+
+# The filter of length Nf, returns h, w and trunc_sinc (see HAMMING FILTER DESIGN)
+def _hamming_filter_kernel(filter_type, fc_norms, Nf):
+    
+    # Importing necessary modules
+    import numpy
+    
+    if filter_type == 'low-pass':
+        return(_hamming_low_pass_kernel(fc_norms[0], Nf))
+    
+    h_low, w, trunc_sinc_low = _hamming_low_pass_kernel(fc_norms[0], Nf)
+    
+    delta = numpy.zeros(Nf)
+    delta[int((Nf-1)/2)] = 1
+    
+    if filter_type == 'high-pass':
+        h = delta - h_low
+        trunc_sinc = numpy.pi*delta - trunc_sinc_low
+    else:
+        h_high, _, trunc_sinc_high = _hamming_low_pass_kernel(fc_norms[1], Nf)
+        h = h_high - h_low                      # band pass
+        trunc_sinc = trunc_sinc_high - trunc_sinc_low
+        if filter_type == 'band-stop':
+            h = delta - h
+            trunc_sinc = numpy.pi*delta - trunc_sinc
+    
+    return(h, w, trunc_sinc)
+
+def _hamming_low_pass_kernel(fc_norm, Nf):
+    
+    # Importing necessary modules
+    import numpy
+    
+    n = numpy.arange(Nf)
+    m = n-(Nf-1)/2      # the coefficients distance from the centre of the filter
+    
+    w = (25/46) - (21/46)*numpy.cos(2*numpy.pi*n/(Nf-1))
+    
+    trunc_sinc = numpy.empty(Nf)
+    not_centre = m != 0
+    trunc_sinc[not_centre] = numpy.sin(2*numpy.pi*fc_norm*m[not_centre])/m[not_centre]
+    trunc_sinc[~not_centre] = 2*numpy.pi*fc_norm      # the limit of the sinc at its centre
+    
+    # normalize the low pass filter impulse responce
+    h = w*trunc_sinc
+    h = h/numpy.sum(h)
+    
+    return(h, w, trunc_sinc)
+
+# Returns the filter coefficients h shaped to broadcast against an ndim dimensional signal with its samples along axis
+def _kernel_along_axis(h, ndim, axis):
+    shape = [1]*ndim
+    shape[axis] = len(h)
+    return(h.reshape(shape))
+
+# Returns array[start:stop] along axis
+def _slice_along_axis(array, start, stop, axis):
+    return(array[(slice(None),)*axis + (slice(start, stop),)])
+
+""" --- CHOOSING THE CONVOLUTION METHOD -------------------------------------------
+
+Returns the quickest applied_domain ('time', 'frequency' or 'overlap-add') for filtering a signal of N points with a filter of Nf coefficients.
+
+Which is quickest depends on the computer, so it is based on times measured by the "Calibrating the Filter Convolution Methods.py" micro-benchmark,
+which times each method over a grid of N and Nf and saves them to filter_convolution_calibration.json next to this file (re-run it to calibrate
+for a new computer). The log of the times is interpolated (bilinearly in log(N) and log(Nf)) between the grid points, and held at the edges of the
+grid outside it. If there isnt a calibration file 'frequency' is used, as it was before 'auto' was added.
+"""
+
+@lru_cache(maxsize = 1)
+def _convolution_calibration():
+    
+    # Importing necessary modules
+    import os
+    import json
+    import numpy
+    
+    calibration_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filter_convolution_calibration.json')
+    if not os.path.exists(calibration_path):
+        return(None)
+    
+    with open(calibration_path) as calibration_file:
+        calibration = json.load(calibration_file)
+    log_times = {method: numpy.log10(times) for method, times in calibration['times'].items()}
+    return(numpy.log10(calibration['signal_lengths']), numpy.log10(calibration['filter_lengths']), log_times)
+
+def _choose_convolution_method(N, Nf):
+    
+    # Importing necessary modules
+    import numpy
+    
+    calibration = _convolution_calibration()
+    if calibration is None or N == 0:
+        return('frequency')
+    log_signal_lengths, log_filter_lengths, log_times = calibration
+    
+    # The grid cell (i, j) N and Nf are in, and how far across it they are
+    def grid_position(grid, value):
+        value = min(max(numpy.log10(value), grid[0]), grid[-1])
+        i = min(int(numpy.searchsorted(grid, value, 'right')) - 1, len(grid) - 2)
+        return(i, (value - grid[i])/(grid[i+1] - grid[i]))
+    
+    i, fi = grid_position(log_signal_lengths, N)
+    j, fj = grid_position(log_filter_lengths, Nf)
+    
+    def interpolated_log_time(method):
+        T = log_times[method]
+        return((1-fi)*(1-fj)*T[i, j] + fi*(1-fj)*T[i+1, j] + (1-fi)*fj*T[i, j+1] + fi*fj*T[i+1, j+1])
+    
+    return(min(log_times, key = interpolated_log_time))
+
+def hamming_low_pass_filter(fc, transition_width, signal, dt, time_shift_removed = 'n', applied_domain = 'unspecified', interactive = 'unspecified', axis = -1, attenuation = 'unspecified', dtype = 'unspecified', out = None):
+    return(_hamming_filter('low-pass', (fc,), transition_width, signal, dt, time_shift_removed, applied_domain, interactive, axis, attenuation, dtype, out))
+
+# The filter engine shared by every filter type, see hamming_low_pass_filter for the inputs and outputs, and _hamming_filter_design for filter_type and cutoffs
+def _hamming_filter(filter_type, cutoffs, transition_width, signal, dt, time_shift_removed, applied_domain, interactive, axis, attenuation = 'unspecified', dtype = 'unspecified', out = None):
+    
+    # Importing necessary modules
+    import numpy
+    from scipy.signal import fftconvolve, oaconvolve, lfilter
+    from yes_no_input_checker import yes_no_input_checker, output_array_checker
+    
+    # Checking the user input is either 'y' for yes or 'n' for no, before any time is spent filtering
+    time_shift_removed = yes_no_input_checker(time_shift_removed, interactive)
+    
+    # Generating the filter impulse responce_____________
+        
+    signal = numpy.asarray(signal)
+    axis = axis % signal.ndim           # the axis the signal(s) are along, as a positive number
+    fs = 1/dt                           # sampling frequency of the input signal
+    N = signal.shape[axis]              # number of points in signal
+    fc_norms = tuple(fc/fs for fc in cutoffs)   # normalized cutoff frequencies
+    tw_norm = transition_width/fs       # normalized transition width
+    
+    # The filter is designed (or taken from the cache if it has been designed before) from the normalized frequencies, see _hamming_filter_design
+    h, Nf, w, trunc_sinc = _hamming_filter_design(filter_type, fc_norms, tw_norm, attenuation)
         
     # Working out the Delay caused by the filter
     t_shift = ((Nf-1)/2)*dt     # time shift, see Ifeachor Emmanuel, Jervis Barrie - 1993 - Digital Signal Processing Chpt on FIR filter design.
     samples_shift = int((Nf-1)/2)  # working out the shift as the equivalent of sample rather than seconds.
     
-    # Initilizing arrays
-    filtered_signal = numpy.zeros(N)   # y_filtered will be the output signal from the filter
-    h = numpy.zeros(Nf)    # h will be the filter impulse responce
-    w = numpy.zeros(Nf)    # w will be the filter window
-    trunc_sinc = numpy.zeros(Nf)    # trunc_sinc is our ideal low pass filter impulse responce truncated to Nf points    
-
+    # Checking out (if it was given) fits the filtered signal, and converting the filter to the dtype the filtering is done in (the signal is
+    # converted as it is convolved, a block at a time if out is given)
+    out_shape = list(signal.shape)
+    out_shape[axis] = max(N - samples_shift, 0) if time_shift_removed == 'y' else N
+    dtype = output_array_checker(out, out_shape, dtype)
+    h_applied = h.astype(dtype, copy = False)
+    
     # working out frequency spectrum and time arrays
     df_filt = 1/(Nf*dt)
     t_array_filt = numpy.arange(0, Nf*dt, dt)[:Nf]
     freq_spec_filt = numpy.arange(0, Nf*df_filt, df_filt)[:Nf]
-        
-    for n in range(0,Nf):
-        w[n] = (25/46) - (21/46)*numpy.cos(2*numpy.pi*n/(Nf-1))
-        if n-(Nf-1)/2 == 0:
-            trunc_sinc[n] = 2*numpy.pi*fc_norm
-            h[n] = w[n]*trunc_sinc[n]
-        else:
-            trunc_sinc[n] = numpy.sin(2*numpy.pi*fc_norm*(n-(Nf-1)/2))/(n-(Nf-1)/2)
-            h[n] = w[n]*trunc_sinc[n]
     
-    h_unnorm = numpy.copy(h)    # before I normalize h (necessary for using filter) I want to keep h as it was calculated,
-                                # in case the person wants to actually look at the calculated h=w*trunc_sinc, could be useful for debugging
-            
-    # normalize the low pass filter impulse responce
-    h = h/numpy.sum(h)
+    if applied_domain == 'auto':
+        applied_domain = _choose_convolution_method(N, Nf)      # the quickest method for N and Nf, see CHOOSING THE CONVOLUTION METHOD
     
     if applied_domain == 'time':
-        # Performing the Convolution
-        for j in range(0, N):      # NB with a stopping condition of N in the range function, the final computed itereation will be j= N-1
-            for n in range(0,Nf):     # NB with a stopping condition of Nf in the range function, the final computed itereation will be n= Nf-1
-                if j-n < 0:    # we need this else when j-n<0, signal[-ve number] will start getting points at the end of the signal array
-                    break
-                else:
-                    filtered_signal[j] = filtered_signal[j] + (signal[j-n]*h[n])
+        # Performing the Convolution, filtered_signal[j] = sum of signal[j-n]*h[n] for n = 0 to min(j, Nf-1). lfilter does this causal
+        # (direct form) convolution in compiled code, rather than the original double for loop over j and n, so the output is the same
+        # (to rounding, as the products are added in a different order) but is thousands of times faster.
+        def convolve(signal):
+            return(lfilter(h_applied, numpy.ones(1, dtype), signal, axis = axis))
+    
+    elif applied_domain == 'overlap-add':
+        # Performing the convolution with ffts of blocks of the signal about the size of the filter, rather than one fft of the whole signal
+        def convolve(signal):
+            return(_slice_along_axis(oaconvolve(signal, _kernel_along_axis(h_applied, signal.ndim, axis), axes = axis), 0, signal.shape[axis], axis))
                     
     else:   # if applied_domain is not 'time', then frequency is used.
-        # Performing the fft and ifft using a scipy function
-        filtered_signal = fftconvolve(signal, h)    # utilizes the fact that multiplication in the frequency domain is convolution in the time domain.
-        
-        # Removing the zero padding applied by fftconvolve
-        filtered_signal = filtered_signal[:len(signal)]
+        # Performing the fft and ifft using a scipy function, utilizes the fact that multiplication in the frequency domain is convolution in the
+        # time domain. The zero padding applied by fftconvolve is removed.
+        def convolve(signal):
+            return(_slice_along_axis(fftconvolve(signal, _kernel_along_axis(h_applied, signal.ndim, axis), axes = axis), 0, signal.shape[axis], axis))
                                           
         if applied_domain != 'frequency':
-           print('WARNING --------------- \n"applied_domain" input was not "time" or "frequency", "frequency" was used by default.')
+           print('WARNING --------------- \n"applied_domain" input was not "time", "frequency", "overlap-add" or "auto", "frequency" was used by default.')
     
     # Accounting for the time shift caused by filtering______________
             
     # The user can choose to remove the time shift caused by filtering. If they define time_shift_removed = 'y' the output filtered_signal 
     # will be have zero phase delay/time shift. The output signal is shifted to have zero time shift and as a result is 'samples_shift' shorter.
     
-    # This function is used to check the user input is either 'y' for yes or 'n' for no.
-    def yes_no_input_checker(user_input):
-        if user_input != 'y' and user_input != 'n':
-            user_input = input('Invalid input, please re-enter y for yes or n for no: ')
-            return(yes_no_input_checker(user_input))
-        else:
-            return(user_input)
+    first_point = samples_shift if time_shift_removed == 'y' else 0     # the first point of the filtered signal that is kept
     
-    time_shift_removed = yes_no_input_checker(time_shift_removed)
+    if out is None:
+        filtered_signal = _slice_along_axis(convolve(signal.astype(dtype, copy = False)), first_point, N, axis)  # shifting the filtered_signal 'samples_shift' left (if time_shift_removed is 'y') so it now has zero time delay.
+    else:
+        _convolve_into(convolve, signal, Nf, first_point, out, axis, dtype)
+        filtered_signal = out
     
-    if time_shift_removed == 'y':
-        filtered_signal = filtered_signal[samples_shift:len(filtered_signal)]  # shifting the filtered_signal 'samples_shift' left so it now has zero time delay.
-            
     return(filtered_signal, h, Nf, freq_spec_filt, t_array_filt, t_shift, samples_shift, w, trunc_sinc)
+
+# Writes convolve(signal) (from first_point on) into out a block of about OUT_BLOCK_SIZE points at a time, so when out is given (eg a slice of a
+# memory mapped file) the working arrays stay the size of a block however long the signal is. Each block of the filtered signal is worked out
+# from the block of the signal and the Nf-1 points before it, which is all a point of the filtered signal depends on, so it is the same (to rounding)
+# as filtering the whole signal at once.
+OUT_BLOCK_SIZE = 2**22      # 32 MB of float64 per working array
+
+def _convolve_into(convolve, signal, Nf, first_point, out, axis, dtype):
+    
+    N = signal.shape[axis]
+    block_length = max(OUT_BLOCK_SIZE*N//max(signal.size, 1), 8*Nf)     # the number of points (along axis) in each block
+    for block_start in range(first_point, N, block_length):
+        block_stop = min(block_start + block_length, N)
+        start = max(block_start - (Nf-1), 0)        # the first signal point the block depends on
+        filtered_block = convolve(_slice_along_axis(signal, start, block_stop, axis).astype(dtype, copy = False))
+        _slice_along_axis(out, block_start - first_point, block_stop - first_point, axis)[...] = _slice_along_axis(filtered_block, block_start - start, block_stop - start, axis)
+
+""" --- CREATING HAMMING HIGH PASS, BAND PASS AND BAND STOP FILTERS -------------------------------------------
+
+These work the same way as hamming_low_pass_filter (with the same inputs, other than the cutoff frequencies, and outputs) and share its filter length,
+design cache and ways of applying the filter, see HAMMING FILTER DESIGN for how they are designed.
+
+INPUTS:
+fc: the cutoff frequency of the high pass filter, frequencies above it are kept
+fc_low, fc_high: the lower and upper cutoff frequencies of the band pass filter (the band kept) or band stop filter (the band removed). fc_high
+                 must be above fc_low, and for a clean band they should be at least a transition_width apart.
+"""
+
+def hamming_high_pass_filter(fc, transition_width, signal, dt, time_shift_removed = 'n', applied_domain = 'unspecified', interactive = 'unspecified', axis = -1, attenuation = 'unspecified', dtype = 'unspecified', out = None):
+    return(_hamming_filter('high-pass', (fc,), transition_width, signal, dt, time_shift_removed, applied_domain, interactive, axis, attenuation, dtype, out))
+
+def hamming_band_pass_filter(fc_low, fc_high, transition_width, signal, dt, time_shift_removed = 'n', applied_domain = 'unspecified', interactive = 'unspecified', axis = -1, attenuation = 'unspecified', dtype = 'unspecified', out = None):
+    _check_band(fc_low, fc_high)
+    return(_hamming_filter('band-pass', (fc_low, fc_high), transition_width, signal, dt, time_shift_removed, applied_domain, interactive, axis, attenuation, dtype, out))
+
+def hamming_band_stop_filter(fc_low, fc_high, transition_width, signal, dt, time_shift_removed = 'n', applied_domain = 'unspecified', interactive = 'unspecified', axis = -1, attenuation = 'unspecified', dtype = 'unspecified', out = None):
+    _check_band(fc_low, fc_high)
+    return(_hamming_filter('band-stop', (fc_low, fc_high), transition_width, signal, dt, time_shift_removed, applied_domain, interactive, axis, attenuation, dtype, out))
+
+def _check_band(fc_low, fc_high):
+    from yes_no_input_checker import InvalidInputError
+    if fc_high <= fc_low:
+        raise InvalidInputError('ERROR, fc_high (' + str(fc_high) + ') must be above fc_low (' + str(fc_low) + ')')
+
+""" --- FILTER FREQUENCY RESPONSE -------------------------------------------
+
+Returns the frequency responce of the filter hamming_low_pass_filter (or the high pass, band pass or band stop filter) designs for fc, transition_width
+and dt, without filtering a signal. It is worked out from a single zero padded fft of h, so it is much finer than freq_spec_filt, and is cached along
+with the design (see HAMMING FILTER DESIGN), so asking for it again for the same filter costs nothing. NB the returned arrays are shared with the
+cache and are read only.
+
+The passband is taken to be the frequencies more than transition_width/2 inside the cutoff frequencies and the stopband those more than
+transition_width/2 outside them, ie the transition band is centred on each cutoff frequency (where the hamming windowed sinc is at -6 dB).
+
+INPUTS:
+fc: the cutoff frequency, or for the band pass and band stop filters the lower and upper cutoff frequencies as a tuple (fc_low, fc_high)
+transition_width, dt, attenuation: see hamming_low_pass_filter
+filter_type: 'low-pass' (the default), 'high-pass', 'band-pass' or 'band-stop'
+n_fft: optionally, the fft length the responce is worked out with. By default it is at least 16 times the filter length (and at least 8192) which
+       resolves the stopband ripples. It must be at least Nf.
+
+OUTPUTS:
+frequencies: the frequencies (in Hz) from 0 to the nyquist frequency fs/2 the responce is known at
+magnitude_db: the magnitude of the responce in dB at each frequency, 20*log10(|H|)
+group_delay: the delay (in seconds) of each frequency through the filter. It is t_shift for every frequency, as the filter is linear phase, other than
+             where |H| is close to zero (in the stopband nulls), where it isnt defined and is nan
+passband_ripple: the largest deviation in dB of the passband from 0 dB
+stopband_attenuation: the smallest attenuation in dB across the stopband (nan if the filter doesnt have one, eg fc within transition_width/2 of fs/2)
+h, Nf: the filter impulse responce and filter length, see hamming_low_pass_filter
+"""
+
+def hamming_filter_response(fc, transition_width, dt, filter_type = 'low-pass', attenuation = 'unspecified', n_fft = 'unspecified'):
+    
+    # Importing necessary modules
+    import numpy
+    from yes_no_input_checker import InvalidInputError
+    
+    if filter_type not in FILTER_TYPES:
+        raise InvalidInputError('ERROR, filter_type must be one of ' + ', '.join(FILTER_TYPES) + ', but ' + str(filter_type) + ' was entered')
+    
+    cutoffs = tuple(numpy.atleast_1d(fc).tolist())
+    if len(cutoffs) != (2 if filter_type in ('band-pass', 'band-stop') else 1):
+        raise InvalidInputError('ERROR, fc must be a single frequency for a ' + filter_type + ' filter, or (fc_low, fc_high) for a band filter')
+    if len(cutoffs) == 2:
+        _check_band(*cutoffs)
+    
+    fs = 1/dt
+    frequencies, magnitude_db, group_delay, passband_ripple, stopband_attenuation, h, Nf = _hamming_filter_response(filter_type, tuple(fc/fs for fc in cutoffs), transition_width/fs, attenuation, n_fft)
+    return(frequencies*fs, magnitude_db, group_delay*dt, passband_ripple, stopband_attenuation, h, Nf)
+
+# The frequency responce in normalized frequency (cycles per sample) and group delay in samples, see FILTER FREQUENCY RESPONSE
+@lru_cache(maxsize = DESIGN_CACHE_SIZE)
+def _hamming_filter_response(filter_type, fc_norms, tw_norm, attenuation = 'unspecified', n_fft = 'unspecified'):
+    
+    # Importing necessary modules
+    import numpy
+    from scipy.fft import rfft, rfftfreq
+    from yes_no_input_checker import InvalidInputError
+    
+    h, Nf, w, trunc_sinc = _hamming_filter_design(filter_type, fc_norms, tw_norm, attenuation)
+    if n_fft == 'unspecified':
+        n_fft = _response_fft_length(Nf)
+    elif n_fft < Nf:
+        raise InvalidInputError('ERROR, n_fft must be at least the filter length Nf = ' + str(Nf))
+    
+    H = rfft(h, int(n_fft))
+    frequencies = rfftfreq(int(n_fft))
+    magnitude_db = _magnitude_db(H)
+    
+    # The group delay -d(phase)/d(omega), from the fft of n*h(n) over the fft of h(n), see Smith - 2013 chapter 19. It isnt defined where H is zero.
+    defined = numpy.abs(H) > 1e-8*numpy.max(numpy.abs(H))
+    group_delay = numpy.full(len(H), numpy.nan)
+    group_delay[defined] = numpy.real(rfft(numpy.arange(Nf)*h, int(n_fft))[defined]/H[defined])
+    
+    passband_ripple, stopband_attenuation = _band_performance(filter_type, fc_norms, tw_norm, frequencies, magnitude_db)
+    
+    for array in (frequencies, magnitude_db, group_delay):
+        array.flags.writeable = False
+    return(frequencies, magnitude_db, group_delay, passband_ripple, stopband_attenuation, h, Nf)
+
+def _response_fft_length(Nf):
+    from scipy.fft import next_fast_len
+    return(next_fast_len(max(16*Nf, 8192), True))
+
+def _magnitude_db(H):
+    import numpy
+    return(20*numpy.log10(numpy.maximum(numpy.abs(H), 1e-300)))
+
+# The passband ripple and stopband attenuation (in dB) of a responce, nan for a band with no frequencies in it
+def _band_performance(filter_type, fc_norms, tw_norm, frequencies, magnitude_db):
+    
+    # Importing necessary modules
+    import numpy
+    
+    below = frequencies <= fc_norms[0] - tw_norm/2      # below the (lower) transition band
+    above = frequencies >= fc_norms[-1] + tw_norm/2     # above the (upper) transition band
+    between = (frequencies >= fc_norms[0] + tw_norm/2) & (frequencies <= fc_norms[-1] - tw_norm/2)      # between the transition bands of a band filter
+    
+    passband, stopband = {'low-pass': (below, above),
+                          'high-pass': (above, below),
+                          'band-pass': (between, below | above),
+                          'band-stop': (below | above, between)}[filter_type]
+    
+    passband_ripple = numpy.max(numpy.abs(magnitude_db[passband])) if passband.any() else numpy.nan
+    stopband_attenuation = -numpy.max(magnitude_db[stopband]) if stopband.any() else numpy.nan
+    return(float(passband_ripple), float(stopband_attenuation))
+
+# The shortest filter length (odd) that gives at least attenuation dB of stopband attenuation over the transition width, see HAMMING FILTER DESIGN.
+# The attenuation grows with the filter length (other than small wiggles as the stopband ripples move), so it is found by bisection between 3 and
+# four times the length the transition width alone gives.
+def _shortest_hamming_filter_length(filter_type, fc_norms, tw_norm, attenuation):
+    
+    # Importing necessary modules
+    from scipy.fft import rfft, rfftfreq
+    from yes_no_input_checker import InvalidInputError
+    
+    def meets_attenuation(Nf):
+        h = _hamming_filter_kernel(filter_type, fc_norms, Nf)[0]
+        n_fft = _response_fft_length(Nf)
+        stopband_attenuation = _band_performance(filter_type, fc_norms, tw_norm, rfftfreq(n_fft), _magnitude_db(rfft(h, n_fft)))[1]
+        return(not stopband_attenuation < attenuation)      # a filter without a stopband meets any attenuation
+    
+    low = 1                                     # (odd) lengths known to be too short, or 1
+    high = 4*_hamming_filter_length(tw_norm) + 1    # (odd) lengths known to be long enough
+    if not meets_attenuation(high):
+        raise InvalidInputError('ERROR, a hamming filter cant give ' + str(attenuation) + ' dB of stopband attenuation over this transition width, '
+                                + 'the hamming window gives about 53 dB at most, so use a lower attenuation (or leave it unspecified)')
+    while high - low > 2:
+        middle = low + 2*((high - low)//4)
+        if meets_attenuation(middle):
+            high = middle
+        else:
+            low = middle
+    return(high)
  
 # --------------------------------------------------------------------------------------------------------------------------------    
 # -------------------------------------------------------------------------------------------------------------------------------- 
@@ -183,76 +544,311 @@ def hamming_low_pass_filter(fc, transition_width, signal, dt, time_shift_removed
  If it is multiple arrays of data for which more than one was filtered:
  signal: is a dictionary where the keys, signal_dict.keys(): 'P_vent', 'P_vent_filtered', 'ECG', 'ECG_filtered' and the values are the respective arrays
  Nf: is a dictionary where Nf.keys(): 'Nf_P_vent_filtered', 'Nf_ECG_filtered' and the values are the number of filter coefficients for the respective filtered signals
- The naming for this instance is important, Nf_ followed by the signal name, as the signal assosiated with the max Nf is trimmed slightly differently to the others if
- time_shift_removed was 'yes'when the filtering occurred.
+ The naming for this instance is Nf_ followed by the signal name.
+
+ The other inputs are optional:
+ in_place: if True (the default) a dictionary of signals is trimmed in place, ie the callers dictionary has its signals replaced by the trimmed ones. If
+           False the dictionary isnt changed and a new dictionary of the trimmed signals is returned instead.
+ axis: for a 2-D array of signals (eg (channels, samples), all filtered with the same Nf), the axis the samples are along (the last by default)
+ interactive: if time_shift_removed isnt 'y' or 'n', True asks the user to re-enter it and False raises a YesNoInputError, see yes_no_input_checker.py
+
+ Signals can also be a pandas DataFrame with a column for each signal (one row per sample, any filtered signals that are shorter padded at the end),
+ which is trimmed like a dictionary. Nf can be an integer or a dictionary of Nfs for any type of signal, only the largest Nf is used.
 
  OUTPUTS ---------------------------
- trimmed_signals: the trimmed signals
- trim: the amount of elements that were trimmed
+ trimmed_signals: the trimmed signals, of the same type as signal. The trimmed arrays (and DataFrame) are views of the signals passed in rather
+                  than copies, so trimming even a very large dictionary of signals takes no time or memory. NB changing a trimmed signal
+                  therefore changes the original too, copy it first if this isnt wanted.
+ NB if time_shift_removed is 'n' every signal has the Nf-1 unusable points removed from its start (a dictionary of signals used to have Nf removed)
 """
 
-def filtered_signals_trimmer(signal, Nf, time_shift_removed):
+def filtered_signals_trimmer(signal, Nf, time_shift_removed, in_place = True, axis = -1, interactive = 'unspecified'):
     
+    # Importing necessary modules
+    import numpy
+    from yes_no_input_checker import yes_no_input_checker, InvalidInputError
+    try:
+        from pandas import DataFrame
+    except ImportError:
+        DataFrame = ()      # pandas isnt installed, so signal cant be a DataFrame
     
-    if str(type(signal)) == "<class 'numpy.ndarray'>":
-    # A SINGLE SIGNAL NEEDING TRIMMING ------------------------------------------------------------
-        if str(type(Nf)) != "<class 'int'>":
-            print("ERROR, a single signal was passed to the function, but the number of filter coefficients Nf was not of integer type\n please refer to function comments for more details")
+    # Calculating the trim to be applied, from the longest filter (ie most coefficients Nf)
+    time_shift_removed = yes_no_input_checker(time_shift_removed, interactive)
+    Nf_max = max(Nf.values()) if isinstance(Nf, dict) else Nf
+    
+    if time_shift_removed == 'y':
+        trim = int((Nf_max-1)/2)
+    else:
+        trim = Nf_max-1
+    
+    if isinstance(signal, numpy.ndarray):
+    # A SINGLE SIGNAL (OR A 2-D ARRAY OF SIGNALS FILTERED THE SAME WAY) NEEDING TRIMMING ------------------------------------
+        return(_slice_along_axis(signal, trim, None, axis % signal.ndim))
+    
+    # MULTIPLE SIGNALS NEEDING TRIMMING, IN A DICTIONARY OR DATAFRAME ------------------------------------------------------
+    # If the time shift was removed the filtered signals are shorter than the unfiltered ones, so the end of every signal is trimmed as well as the
+    # start, to leave the part of each signal that lines up with the usable part of the filtered signal with the largest Nf.
+    if isinstance(signal, dict):
+        N = max(len(values) for values in signal.values())   # the length of the raw unfiltered signals before trimming
+        stop = N-trim if time_shift_removed == 'y' else N
         
-        # Calculating the trim to be applied
-        else:
-            if time_shift_removed == 'y':
-                trim = int((Nf-1)/2)
-            elif time_shift_removed == 'n':
-                trim = Nf-1
-            else:
-                print("for trim to be defined, time_shift_removed argument\n should be passed as 'n' for no or 'y' for yes")
+        trimmed_signal = signal if in_place else {}
+        for key, values in signal.items():
+            trimmed_signal[key] = values[trim:stop]
+        return(trimmed_signal)
+    
+    if isinstance(signal, DataFrame):
+        stop = len(signal)-trim if time_shift_removed == 'y' else len(signal)
+        return(signal.iloc[trim:stop])
     
-            # Applying the trim
-            signal = signal[trim:]  # trimming the filtered signal
+    raise InvalidInputError('ERROR, the signal(s) entered were not an array, dictionary or DataFrame, refer to the function documentation')
+    
+# --------------------------------------------------------------------------------------------------------------------------------    
+# -------------------------------------------------------------------------------------------------------------------------------- 
+# --------------------------------------------------------------------------------------------------------------------------------    
+
+""" _____________________________________________ STREAMING HAMMING LOW PASS FILTER ______________________________________________
+
+ A version of hamming_low_pass_filter for continuous signals that arrive a chunk at a time and never fit in memory. The stream is created
+ once with the filter inputs, each new chunk is passed to its push method, which returns the filtered signal for the chunk, and once the
+ signal has finished close returns the rest of the filtered signal. Put together the outputs of push and close are the same (to rounding)
+ as hamming_low_pass_filter on the whole signal, no matter how the signal was split into chunks.
+
+ The filter is applied with overlap-save: the signal is filtered in fixed size blocks of block_length new points, each of which is
+ joined onto the last Nf-1 points of the signal before it (the filter tail, carried between calls) to make fft_length points. The
+ circular convolution of these with the filter, done with an fft, is only wrong for its first Nf-1 points, which are discarded leaving
+ the block_length filtered points. Every complete block pushed is filtered at once with a single 2-D fft. Points that dont make up a
+ complete block wait until the next push (or close), so the output lags the input by up to block_length-1 points.
+
+ The fft_length is chosen automatically from Nf as the fast fft length (see scipy.fft.next_fast_len) with the least work per filtered
+ point, as a longer fft filters more points at once but each fft costs more.
+
+ INPUTS ----------------------------
+ fc, transition_width, dt, attenuation: see hamming_low_pass_filter, the filter design is shared with it (and its design cache)
+ time_shift_removed: 'y' or 'n', if 'y' the first samples_shift filtered points of the stream are dropped so the output has no time shift,
+                     as in hamming_low_pass_filter. An invalid input raises a YesNoInputError, as the stream cant stop to ask for it.
+ fft_length: optionally, the fft length to use instead of the automatic one, it must be at least Nf
+
+ EXAMPLE:
+ stream = HammingLowPassStream(fc = 3.5, transition_width = 3, dt = 0.04, time_shift_removed = 'y')
+ for chunk in sensor_feed:
+     filtered_chunk = stream.push(chunk)
+ filtered_end = stream.close()
+"""
+
+class HammingLowPassStream:
     
+    def __init__(self, fc, transition_width, dt, time_shift_removed = 'n', fft_length = 'unspecified', attenuation = 'unspecified'):
+        import numpy
+        from scipy.fft import rfft, next_fast_len
+        from yes_no_input_checker import yes_no_input_checker, InvalidInputError
         
-    elif str(type(signal)) == "<class 'dict'>":
-    # MULTIPLE SIGNALS NEEDING TRIMMING, USES DICTIONARIES ----------------------------------------
-        if str(type(Nf)) != "<class 'dict'>":
-            print("ERROR, multiple signals were input for trimming, but Nf was not passed as a dict as expected\n read the function documentation for more details")
-    
-        # Finding longest filter (ie most coefficients Nf)
-        Nf_max_name = max(Nf, key=lambda dict_key: Nf[dict_key])  
-        # NB key= in this line refers to the key of the inbuilt max function! ie key= tells how the input to max is sorted 
-        # for the max to be identified. In our case max's key is the values of the dictionary, as output by the lambda function,
-        # which does used the dictionary keys.
-        # So here max is returning the attribute, in this case the dictionary key!, for max's key, in this case the dictionary values!
+        self.time_shift_removed = yes_no_input_checker(time_shift_removed, interactive = False)
         
-        # Getting the length of the raw unfiltered signals before trimming
-        N = len(max(signal.values(), key=lambda signal_arrays: len(signal_arrays)))   # I know this is horrible to read but it keeps it in one line!
-                                                                                            # it returns the length of the unfiltered signals in signals_dict
+        fs = 1/dt
+        self.h, self.Nf, self.w, self.trunc_sinc = _hamming_filter_design('low-pass', (fc/fs,), transition_width/fs, attenuation)
+        self.t_shift = ((self.Nf-1)/2)*dt
+        self.samples_shift = int((self.Nf-1)/2)
         
-        # Working out the trim
-        if time_shift_removed == 'y':
-            trim = int((Nf[Nf_max_name]-1)/2)
-        elif time_shift_removed == 'n':
-            trim = int(Nf[Nf_max_name])
-        else:
-            print("for trim to be defined, time_shift_removed argument\n should be passed as 'n' for no or 'y' for yes")
+        if fft_length == 'unspecified':
+            # choosing the fft length with the least work (~ fft_length*log(fft_length)) per filtered point
+            fft_lengths = set(next_fast_len(max(k*self.Nf, 64), True) for k in (2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64))
+            fft_length = min(fft_lengths, key = lambda M: M*numpy.log2(M)/(M - self.Nf + 1))
+        elif fft_length < self.Nf:
+            raise InvalidInputError('ERROR, fft_length must be at least the filter length Nf = ' + str(self.Nf))
         
-        # Applying the trim
-        if time_shift_removed == 'y':
-            for key in signal:
-                if Nf_max_name[3:] in signal and 'filt' in signal :
-                    signal[key] = signal[key][trim:]  # trimming the filtered signal which had the largest Nf
-                else:
-                    signal[key] = signal[key][trim:N-trim]    # trimming all other signals
-                    
-        else:   # time_shift_removed is 'n' and so we only need to trim the front unusable points from everything
-            for key in signal:
-                signal[key] = signal[key][trim:]
-                
-    else:
-        print("Error, the signal(s) entered were not of the array or dictionary type,\n refer to the function documentation")
+        self.fft_length = int(fft_length)
+        self.block_length = self.fft_length - (self.Nf-1)       # new points filtered by each fft
+        self.H = rfft(self.h, self.fft_length)
+        
+        self.tail = numpy.zeros(self.Nf-1)      # the last Nf-1 points of the signal, zeros before the signal starts as in hamming_low_pass_filter
+        self.pending = numpy.zeros(0)           # points that dont make up a complete block yet
+        self.to_drop = self.samples_shift if self.time_shift_removed == 'y' else 0     # filtered points still to be dropped for time_shift_removed
+        
+    def push(self, chunk):
+        import numpy
+        
+        points = numpy.concatenate((self.pending, numpy.asarray(chunk, dtype = float).ravel()))
+        number_of_blocks = len(points)//self.block_length
+        self.pending = points[number_of_blocks*self.block_length:]
+        return(self._filter_blocks(points[:number_of_blocks*self.block_length]))
+    
+    # Filters the remaining points, the stream is finished after this
+    def close(self):
+        import numpy
         
-    return(signal)
+        number_of_points = len(self.pending)
+        if number_of_points == 0:
+            return(numpy.zeros(0))
+        
+        points = numpy.concatenate((self.pending, numpy.zeros(self.block_length - number_of_points)))
+        self.pending = numpy.zeros(0)
+        
+        filtered = self._filter_blocks(points)
+        return(filtered[:max(len(filtered) - (self.block_length - number_of_points), 0)])     # dropping the filtered zero padding
+    
+    # Overlap-save of a whole number of blocks of new points
+    def _filter_blocks(self, points):
+        import numpy
+        from numpy.lib.stride_tricks import sliding_window_view
+        from scipy.fft import rfft, irfft
+        
+        if len(points) == 0:
+            return(numpy.zeros(0))
+        
+        signal = numpy.concatenate((self.tail, points))
+        frames = sliding_window_view(signal, self.fft_length)[::self.block_length]      # one row per block, each starting with the tail before it
+        filtered = irfft(rfft(frames, axis = 1)*self.H, self.fft_length, axis = 1)[:, self.Nf-1:].ravel()
+        self.tail = signal[len(signal) - (self.Nf-1):]
+        
+        # Removing the time shift, see time_shift_removed
+        dropped = min(self.to_drop, len(filtered))
+        self.to_drop -= dropped
+        return(filtered[dropped:])
+
+# --------------------------------------------------------------------------------------------------------------------------------    
+# -------------------------------------------------------------------------------------------------------------------------------- 
+# --------------------------------------------------------------------------------------------------------------------------------    
+
+""" _____________________________________________ DECIMATING HAMMING LOW PASS FILTER ______________________________________________
+
+ Low pass filters and downsamples a signal in one go, keeping every decimation_factor'th filtered point. The output is the same (to rounding) as
+ hamming_low_pass_filter(...)[0][::decimation_factor], but only the kept points are calculated, using a polyphase filter: the filter coefficients
+ and the signal are each split into decimation_factor phases (every decimation_factor'th point, starting from 0, 1, 2 etc) and each kept point is
+ the sum of the convolutions of the matching phases. Each phase convolution is decimation_factor times shorter, so filtering takes about
+ decimation_factor times less work than filtering every point and then throwing most of them away.
+
+ NB the cutoff frequency should be below the new Nyquist frequency, fc < 1/(2*dt*decimation_factor), with room for the transition width, or
+ frequencies above it will alias into the downsampled signal.
+
+ INPUTS ----------------------------
+ fc, transition_width, signal, dt, time_shift_removed, interactive, axis, attenuation: see hamming_low_pass_filter. If time_shift_removed is 'y' the kept points
+     are every decimation_factor'th point of the filtered signal after the time shift is removed.
+ decimation_factor: the integer factor to downsample by, eg 10 keeps every 10th filtered point, so the output has a step size of dt*decimation_factor
+ applied_domain: how each phase convolution is done, 'time', 'frequency', 'overlap-add' or 'auto' (the default), see hamming_low_pass_filter
+
+ OUTPUTS ---------------------------
+ decimated_signal: the filtered and downsampled signal(s), the other outputs are the same as hamming_low_pass_filter (NB t_shift and samples_shift
+                   are of the original signal, samples_shift/decimation_factor is the shift in decimated points)
+
+ STREAMING -------------------------
+ HammingDecimatingStream does the same for a signal that arrives a chunk at a time, see HammingLowPassStream for how it is used. push returns the
+ kept points that can be calculated from the signal so far, and as the filter is causal every kept point is returned by the push of the chunk its
+ point is in, so close has nothing left to return. Put together the outputs of push are the same (to rounding) as the one shot filter.
+"""
+
+def hamming_decimating_low_pass_filter(fc, transition_width, signal, dt, decimation_factor, time_shift_removed = 'n', applied_domain = 'auto', interactive = 'unspecified', axis = -1, attenuation = 'unspecified'):
     
+    # Importing necessary modules
+    import numpy
+    from yes_no_input_checker import yes_no_input_checker
+    
+    time_shift_removed = yes_no_input_checker(time_shift_removed, interactive)
+    _check_decimation_factor(decimation_factor)
+    
+    signal = numpy.asarray(signal)
+    axis = axis % signal.ndim
+    fs = 1/dt
+    h, Nf, w, trunc_sinc = _hamming_filter_design('low-pass', (fc/fs,), transition_width/fs, attenuation)
+    
+    t_shift = ((Nf-1)/2)*dt
+    samples_shift = int((Nf-1)/2)
+    df_filt = 1/(Nf*dt)
+    t_array_filt = numpy.arange(0, Nf*dt, dt)[:Nf]
+    freq_spec_filt = numpy.arange(0, Nf*df_filt, df_filt)[:Nf]
+    
+    first_kept = samples_shift if time_shift_removed == 'y' else 0     # the first kept point of the (undecimated) filtered signal
+    decimated_signal = _polyphase_decimate(h, numpy.moveaxis(signal, axis, -1), int(decimation_factor), first_kept, applied_domain)
+    
+    return(numpy.moveaxis(decimated_signal, -1, axis), h, Nf, freq_spec_filt, t_array_filt, t_shift, samples_shift, w, trunc_sinc)
+
+def _check_decimation_factor(decimation_factor):
+    from yes_no_input_checker import InvalidInputError
+    if decimation_factor < 1 or decimation_factor != int(decimation_factor):
+        raise InvalidInputError('ERROR, decimation_factor must be a positive integer, but ' + str(decimation_factor) + ' was entered')
+
+# Returns the points first_kept, first_kept + D, first_kept + 2*D etc (up to the end of signal) of the causal convolution of signal (along its last
+# axis) with h, see DECIMATING HAMMING LOW PASS FILTER. The signal before its first point is taken to be zeros, as in hamming_low_pass_filter.
+def _polyphase_decimate(h, signal, D, first_kept, applied_domain = 'auto'):
+    
+    # Importing necessary modules
+    import numpy
+    from scipy.signal import fftconvolve, oaconvolve, lfilter
+    
+    Nf = len(h)
+    batch_shape = signal.shape[:-1]
+    
+    # Only the Nf-1 points before the first kept point are needed, and zeros are added to the start so the first kept point is a multiple of D
+    # (in the padded signal), which makes the first kept point the first point of phase 0. The padded signal then starts with D-1 more zeros,
+    # so every phase has a point for each kept point.
+    signal_start = max(first_kept - (Nf-1), 0)
+    first_kept = first_kept - signal_start
+    padding = (-first_kept) % D
+    skipped = (first_kept + padding)//D        # the number of phase points before the first kept point
+    
+    N = signal.shape[-1] - signal_start + padding
+    K = -(-N//D)                # number of points in each phase
+    P = -(-Nf//D)               # number of filter coefficients in each phase
+    if N <= padding + first_kept or K <= skipped:
+        return(numpy.zeros(batch_shape + (0,)))
+    
+    padded_signal = numpy.concatenate((numpy.zeros(batch_shape + (D-1+padding,)), signal[..., signal_start:], numpy.zeros(batch_shape + (K*D-N,))), axis = -1)
+    signal_phases = numpy.ascontiguousarray(numpy.swapaxes(padded_signal[..., :K*D].reshape(batch_shape + (K, D)), -1, -2))     # row q is the signal phase D-1-q (contiguous, as lfilter is much slower on strided rows)
+    filter_phases = numpy.concatenate((h, numpy.zeros(P*D-Nf))).reshape(P, D).T[::-1]                      # so it is convolved with filter phase D-1-q
+    
+    if applied_domain == 'auto':
+        applied_domain = _choose_convolution_method(K, P)
+    
+    if applied_domain == 'time':
+        decimated_signal = lfilter(filter_phases[0], 1.0, signal_phases[..., 0, :])
+        for q in range(1, D):
+            decimated_signal += lfilter(filter_phases[q], 1.0, signal_phases[..., q, :])
+    else:
+        convolve = oaconvolve if applied_domain == 'overlap-add' else fftconvolve
+        decimated_signal = convolve(signal_phases, filter_phases.reshape((1,)*len(batch_shape) + (D, P)), axes = -1)[..., :K].sum(axis = -2)
+    
+    return(decimated_signal[..., skipped:])
+
+class HammingDecimatingStream:
+    
+    def __init__(self, fc, transition_width, dt, decimation_factor, time_shift_removed = 'n', applied_domain = 'auto', attenuation = 'unspecified'):
+        import numpy
+        from yes_no_input_checker import yes_no_input_checker
+        
+        self.time_shift_removed = yes_no_input_checker(time_shift_removed, interactive = False)
+        _check_decimation_factor(decimation_factor)
+        
+        fs = 1/dt
+        self.h, self.Nf, self.w, self.trunc_sinc = _hamming_filter_design('low-pass', (fc/fs,), transition_width/fs, attenuation)
+        self.t_shift = ((self.Nf-1)/2)*dt
+        self.samples_shift = int((self.Nf-1)/2)
+        self.decimation_factor = int(decimation_factor)
+        self.applied_domain = applied_domain
+        
+        self.tail = numpy.zeros(self.Nf-1)      # the last Nf-1 points of the signal, zeros before the signal starts
+        self.N = 0                              # number of points received so far
+        self.next_kept = self.samples_shift if self.time_shift_removed == 'y' else 0      # the next kept point of the filtered signal
+        
+    def push(self, chunk):
+        import numpy
+        
+        points = numpy.concatenate((self.tail, numpy.asarray(chunk, dtype = float).ravel()))
+        points_start = self.N - (self.Nf-1)      # the index in the whole signal of points[0]
+        self.N += len(points) - len(self.tail)
+        self.tail = points[len(points) - (self.Nf-1):]
+        
+        if self.next_kept >= self.N:
+            return(numpy.zeros(0))
+        
+        decimated_chunk = _polyphase_decimate(self.h, points, self.decimation_factor, self.next_kept - points_start, self.applied_domain)
+        self.next_kept += len(decimated_chunk)*self.decimation_factor
+        return(decimated_chunk)
+    
+    # Every kept point has already been returned by push, as the filter is causal, this is here so it is used the same way as HammingLowPassStream
+    def close(self):
+        import numpy
+        return(numpy.zeros(0))
+
 #%% ------------------------------------------------------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------------------
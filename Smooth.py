@@ -5,6 +5,8 @@ Created on Fri May 13 13:19:35 2016
 @author: jcb137
 """
 
+from functools import lru_cache
+
 # ----------------------------------------------- CENTRAL SMOOTHING FUNCTION ------------------------------------------
 # this just takes the central rolling average of a signal, like the matlab smooth fucntion. 
 
@@ -31,37 +33,51 @@ Created on Fri May 13 13:19:35 2016
 # INPUTS: 
 # signal: either an array of numbers you want to smooth
 # points_in_rolling_average: number of points used in the rolling average. NB this number should be odd.
+# interactive: if points_in_rolling_average is even, True asks the user to re-enter it and False raises an EvenNumberError. By default
+#              the user is only asked if stdin is a terminal, see yes_no_input_checker.py
+# dtype: the floating point type the smooth is calculated in and returned as, float64 by default (or outs dtype if out is given). float32
+#        halves the memory used, see FLOAT32 ACCURACY below.
+# out: optionally, an array (of the signals shape) the smoothed signal is written into rather than a new array, eg a slice of a memory
+#      mapped file. It is also what is returned. The smooth is worked out a block of about POINTS_BLOCK_SIZE points at a time (see WINDOW
+#      MEANS), so its working arrays stay a few MB however long the signal is, and with out given no array the size of the signal is made.
+# axis: signal can also be a 2-D (or more) array of several signals, or a pandas DataFrame with a signal in each column, in which case axis is
+#       the axis the samples are along. By default it is the last axis of an array, eg (channels, samples), and down the columns (axis 0) of a
+#       DataFrame. Every signal is smoothed at once, in a single vectorized pass, and the smoothed signals have the same shape (or are a
+#       DataFrame with the same index and columns).
+# workers: the number of threads the signals are shared between, eg 4 smooths blocks of the columns of a very wide DataFrame in 4 threads at
+#          once (the numpy and scipy work releases the GIL, so they run at the same time). 1 (the default) uses no threads, and a single signal
+#          (or a few short ones) is always smoothed in one go.
+
+# FLOAT32 ACCURACY -------------------
+# float32 has a 24 bit mantissa, ie about 7 significant figures (a relative rounding error of 6e-8). The window sums are always worked out in
+# float64 (see WINDOW MEANS below) and only the smoothed signal is rounded to dtype, so a float32 smooth is within about 6e-8 of the size of
+# the signal of the float64 smooth (plus the rounding of the signal to float32, if it was float64). This is finer than the resolution of most
+# sensors (a 16 bit ADC resolves 1 part in 65536), so float32 sensor data loses nothing by being smoothed in float32, but a signal with a large
+# offset (eg 1e4 + a small wiggle) loses the wiggles significant figures to the offset, so remove the offset first or keep it in float64.
 
-def central_smooth(signal, points_in_rolling_average):
+def central_smooth(signal, points_in_rolling_average, interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
     
-    # Creating a simple function which will be used to check if points_in_rolling_average is an odd number
-    def odd_number_checker(number_to_check):
-        if number_to_check%2 == 0:  # if this condition is true then the number is even
-            re_entered_number_to_check = int(input('Number of points used in rolling average should be odd, please re-enter the number: '))
-            return(odd_number_checker(re_entered_number_to_check))
-        return(number_to_check)
+    # Importing the function which will be used to check if points_in_rolling_average is an odd number
+    from yes_no_input_checker import odd_number_checker
     
     #Using the function to check the points_in_rolling_average input
-    points_in_rolling_average = odd_number_checker(points_in_rolling_average)
-    
-    from numpy import zeros  
-    smoothed_signal = zeros([len(signal)])
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
     
-    for i in range(0,len(signal)):
-        
-        if i == 0:
-            smoothed_signal[0] = signal[0] 
+    return(_smooth_along_axis(_central_smooth, signal, points_in_rolling_average, dtype, out, axis, workers))
 
-        elif i <= (points_in_rolling_average-1)/2:
-            smoothed_signal[i] = (signal[0:i+i+1].mean()) # if confused by this expression see the example in the function description AND remember that the stop condition value isnt used!
-        
-        elif i >= len(signal) - (points_in_rolling_average-1)/2:
-            smoothed_signal[i] = (signal[i-((len(signal)-i)-1):].mean())
-            
-        else:            
-            smoothed_signal[i] = (signal[i-int((points_in_rolling_average -1)/2): i+(int((points_in_rolling_average-1)/2))+1].mean()) # Plus on in the stop argument ensures our stop point is more more than our forward most point we are averaging with.
-        
-    return(smoothed_signal)
+# Central smooths the signals along the last axis of signal into out
+def _central_smooth(signal, points_in_rolling_average, out):
+    N = signal.shape[-1]
+    half_window = int((points_in_rolling_average-1)/2)
+    _window_means(signal, lambda i: _central_windows(i, N, half_window), N, out.dtype, out)
+
+# The start and stop of the central smooth windows of the points i of a signal of N points, see the example in the function description. Points
+# within half_window of the start use the 2*i+1 points from the start of the signal, and those within it of the end the points from 2*i-N+1 to
+# the end. (If the signal is shorter than the window the start rule wins, and its window stops at the end of the signal.)
+def _central_windows(i, N, half_window):
+    from numpy import where, minimum
+    half_widths = where(i <= half_window, i, where(i >= N - half_window, N-1-i, half_window))
+    return(i - half_widths, minimum(i + half_widths + 1, N))
 
 # ---_______________________________ CAUSAL SMOOTHING FUNCTION _________________________________________________________
 
@@ -82,50 +98,409 @@ def central_smooth(signal, points_in_rolling_average):
 # INPUTS: 
 # signal: either an array of numbers you want to smooth
 # points_in_rolling_average: number of points used in the rolling average. NB this number should be odd.
+# interactive: if points_in_rolling_average is even, True asks the user to re-enter it and False raises an EvenNumberError. By default
+#              the user is only asked if stdin is a terminal, see yes_no_input_checker.py
+# dtype, out, axis, workers: see central_smooth
 
-def causal_smooth(signal, points_in_rolling_average):
+def causal_smooth(signal, points_in_rolling_average, interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
     
-    # Creating a simple function which will be used to check if points_in_rolling_average is an odd number
-    def odd_number_checker(number_to_check):
-        if number_to_check%2 == 0:  # if this condition is true then the number is even
-            re_entered_number_to_check = int(input('Number of points used in rolling average should be odd, please re-enter the number: '))
-            return(odd_number_checker(re_entered_number_to_check))
-        return(number_to_check)
+    # Importing the function which will be used to check if points_in_rolling_average is an odd number
+    from yes_no_input_checker import odd_number_checker
         
     #Using the function to check the points_in_rolling_average input
-    points_in_rolling_average = odd_number_checker(points_in_rolling_average)
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
     
-    from numpy import zeros  
-    smoothed_signal = zeros([len(signal)])
+    return(_smooth_along_axis(_causal_smooth, signal, points_in_rolling_average, dtype, out, axis, workers))
+
+# Causal smooths the signals along the last axis of signal into out
+def _causal_smooth(signal, points_in_rolling_average, out):
     
-    for i in range(0,len(signal)):
-        
-        if i == 0:
-            smoothed_signal[0] = signal[0] 
+    # The window of each point is the points_in_rolling_average points up to and including it, or all the points from the start of the signal
+    _window_means(signal, lambda i: _causal_windows(i, points_in_rolling_average), signal.shape[-1], out.dtype, out)
+
+# The start and stop of the causal smooth windows of the points i
+def _causal_windows(i, points_in_rolling_average):
+    from numpy import maximum
+    return(maximum(i + 1 - points_in_rolling_average, 0), i + 1)
+    
+# ---_______________________________ STREAMING CAUSAL SMOOTH _________________________________________________________
+
+# A version of causal_smooth for live feeds that arrive a chunk at a time, where the history of the signal cant be kept. The stream is created
+# once with points_in_rolling_average, each new chunk is passed to its push method, which returns the smoothed chunk straight away (the smooth
+# is causal, so nothing has to wait for later points), and close ends the stream. Put together the outputs of push are the same (to rounding)
+# as causal_smooth of the whole signal, including the growing windows at its start, no matter how the signal was split into chunks.
+
+# Only the last points_in_rolling_average points are kept, in a ring buffer, along with their running sum. Each new point replaces the oldest
+# point in the buffer and in the running sum, so each point costs the same however long the window is. (The running sum is re-added from the
+# buffer every points_in_rolling_average points, so its rounding errors dont build up over a long feed.) Chunks at least as long as the window
+# are smoothed in one vectorized pass instead, see WINDOW MEANS, and the buffer refilled from the end of the chunk.
 
-        elif i <= points_in_rolling_average-1:
-            smoothed_signal[i] = (signal[0:i+1].mean()) # if confused by this expression see the example in the function description AND remember that the stop condition value isnt used!
+# INPUTS:
+# points_in_rolling_average: see causal_smooth. An even number raises an EvenNumberError, as the stream cant stop to ask for it.
+# dtype: the floating point type the smoothed chunks are returned as, float64 by default, see central_smooth
+
+# EXAMPLE:
+# stream = CausalSmoothStream(points_in_rolling_average = 25)
+# for chunk in sensor_feed:
+#     smoothed_chunk = stream.push(chunk)
+# stream.close()
+
+class CausalSmoothStream:
+    
+    def __init__(self, points_in_rolling_average, dtype = 'unspecified'):
+        import numpy
+        from yes_no_input_checker import odd_number_checker, output_array_checker
+        
+        self.points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive = False)
+        self.dtype = output_array_checker(None, (0,), dtype)
+        
+        self.buffer = numpy.zeros(self.points_in_rolling_average)      # the ring buffer of the last points, zeros where it hasnt been filled yet
+        self.position = 0               # where the next point goes in the buffer
+        self.count = 0                  # the number of points in the buffer, ie the window length, which grows to points_in_rolling_average
+        self.running_sum = 0.0          # the sum of the points in the buffer
+        self.points_since_sum = 0       # points added to the running sum since it was last re-added from the buffer
+        
+    def push(self, chunk):
+        import numpy
+        
+        chunk = numpy.asarray(chunk, dtype = float).ravel()
+        if len(chunk) >= self.points_in_rolling_average:
+            return(self._push_block(chunk))
+        
+        smoothed_chunk = numpy.empty(len(chunk), dtype = self.dtype)
+        for k, point in enumerate(chunk.tolist()):
+            if self.count == self.points_in_rolling_average:
+                self.running_sum -= self.buffer[self.position]      # the oldest point leaves the window
+            else:
+                self.count += 1
+            self.buffer[self.position] = point
+            self.running_sum += point
+            self.position = (self.position + 1) % self.points_in_rolling_average
+            smoothed_chunk[k] = self.running_sum/self.count
             
-        else:            
-            smoothed_signal[i] = ((signal[i-(points_in_rolling_average-1):i+1]).mean()) # Plus on in the stop argument ensures our stop point is more more than our forward most point we are averaging with.
+            self.points_since_sum += 1
+            if self.points_since_sum == self.points_in_rolling_average:
+                self.running_sum = float(self.buffer.sum())
+                self.points_since_sum = 0
+        return(smoothed_chunk)
+    
+    def close(self):
+        import numpy
+        return(numpy.zeros(0, dtype = self.dtype))      # every point was returned by push
         
-    return(smoothed_signal)
+    # Smooths a chunk at least points_in_rolling_average long in one go, from the points in the buffer (oldest first) and the chunk
+    def _push_block(self, chunk):
+        import numpy
+        
+        history = numpy.roll(self.buffer, -self.position)[self.points_in_rolling_average - self.count:]
+        points = numpy.concatenate((history, chunk))
+        smoothed_chunk = _window_means(points, lambda i: _causal_windows(i + len(history), self.points_in_rolling_average), len(chunk), self.dtype)
+        
+        self.buffer = points[-self.points_in_rolling_average:].copy()
+        self.position = 0
+        self.count = self.points_in_rolling_average
+        self.running_sum = float(self.buffer.sum())
+        self.points_since_sum = 0
+        return(smoothed_chunk)
+
+# ---_______________________________ WINDOW MEANS _________________________________________________________
+
+# The engine used by central_smooth and causal_smooth, it returns the mean of signal[..., starts[i]:stops[i]] for the points i = 0 to count-1, ie
+# of the windows of every signal along the last axis, as dtype (written into out if it was given). windows is a function returning the starts
+# and stops of the windows of an array of points i, which must both grow (or stay the same) with i. Rather than taking the mean of each window
+# in turn (O(N*points_in_rolling_average)), the cumulative sum of the signal is taken, and each window sum is the difference of the cumulative
+# sum at the ends of the window, which is O(N) however long the windows are.
+
+# The points are done a block at a time, with the cumulative sum of just the part of the signal the blocks windows cover, so the working arrays
+# are about POINTS_BLOCK_SIZE points (plus a window) however long the signal is, and only out (or the new output array) is the size of the
+# signal (a 1e7 point smooth into out needs about 4 MB, rather than about 570 MB when the whole signal was done at once). The
+# cumulative sum is worked out in float64, after taking the mean of the signal off it, so it doesnt grow along the block and the window sums
+# keep their significant figures (the difference of two large cumulative sums would lose them). The means match taking the mean of each window
+# to rounding, a few times 1e-14 of the size of the signal, which is far below float32 (or sensor) resolution.
+
+POINTS_BLOCK_SIZE = 2**16   # (smaller blocks than this are slower, as each block has a fixed cost)
+
+def _window_means(signal, windows, count, dtype, out = None):
+    
+    from numpy import asarray, float64, empty, zeros, cumsum, divide, arange
     
+    signal = asarray(signal)
+    if out is None:
+        out = empty(signal.shape[:-1] + (count,), dtype = dtype)
+    if count == 0:
+        return(out)
+    
+    offset = signal.mean(axis = -1, keepdims = True, dtype = float64)
+    block_length = max(POINTS_BLOCK_SIZE*signal.shape[-1]//max(signal.size, 1), 2**12)
+    for block_start in range(0, count, block_length):
+        i = arange(block_start, min(block_start + block_length, count))
+        starts, stops = windows(i)
+        low, high = starts[0], stops[-1]        # the part of the signal the blocks windows cover
+        
+        cumulative_sum = zeros(signal.shape[:-1] + (high-low+1,))
+        cumsum(asarray(signal[..., low:high], dtype = float64) - offset, axis = -1, out = cumulative_sum[..., 1:])
+        out[..., i[0]:i[-1]+1] = divide(cumulative_sum[..., stops-low] - cumulative_sum[..., starts-low], stops - starts) + offset
+    return(out)
+
+# ---_______________________________ SMOOTHING ALONG AN AXIS _________________________________________________________
+
+# Runs smoother (_central_smooth, _causal_smooth or _zero_phase_shift_smooth) on signal, a single signal, an array of signals along axis or a
+# DataFrame of signals, see the axis and workers inputs of central_smooth. The smoothers work along the last axis, so the signals are moved
+# there (as views, nothing is copied) and the smoothed signals written straight into the output. Many signals are smoothed in blocks of about
+# BLOCK_SIZE points (of whole signals, split along the first of the other axes), so smoothing a very wide table only needs working arrays the
+# size of a block rather than several copies of the whole table (which was also slower, on a 2e5 x 400 table), and with more than one worker
+# the blocks are shared between the threads.
+
+BLOCK_SIZE = 2**22          # 32 MB of float64 per working array
+
+def _smooth_along_axis(smoother, signal, points_in_rolling_average, dtype, out, axis, workers):
+    
+    import numpy
+    from yes_no_input_checker import output_array_checker, InvalidInputError
+    try:
+        from pandas import DataFrame
+    except ImportError:
+        DataFrame = ()      # pandas isnt installed, so signal cant be a DataFrame
+    
+    if isinstance(signal, DataFrame):
+        smoothed_values = _smooth_along_axis(smoother, signal.to_numpy(), points_in_rolling_average, dtype, out, 0 if axis == 'unspecified' else axis, workers)
+        return(DataFrame(smoothed_values, index = signal.index, columns = signal.columns, copy = False))
+    
+    if workers < 1 or workers != int(workers):
+        raise InvalidInputError('workers must be a positive integer, but ' + str(workers) + ' was entered')
+    
+    signal = numpy.asarray(signal)
+    axis = (-1 if axis == 'unspecified' else axis) % signal.ndim
+    dtype = output_array_checker(out, signal.shape, dtype)
+    smoothed_signal = numpy.empty(signal.shape, dtype = dtype) if out is None else out
+    
+    signals = numpy.moveaxis(signal, axis, -1)
+    smoothed_signals = numpy.moveaxis(smoothed_signal, axis, -1)
+    
+    if signal.ndim == 1 or signal.size <= BLOCK_SIZE:
+        smoother(signals, points_in_rolling_average, smoothed_signals)
+        return(smoothed_signal)
+    
+    block_rows = max(BLOCK_SIZE*signals.shape[0]//signal.size, 1)       # the number of rows (along the first axis) of signals in each block
+    smooth_block = lambda start: smoother(signals[start:start+block_rows], points_in_rolling_average, smoothed_signals[start:start+block_rows])
+    starts = range(0, signals.shape[0], block_rows)
+    
+    if workers == 1:
+        for start in starts:
+            smooth_block(start)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(int(workers)) as pool:
+            for result in pool.map(smooth_block, starts):
+                pass        # (getting each result raises any exception from its thread)
+    
+    return(smoothed_signal)
 
 # ---_______________________________ ZERO PHASE SHIFT SMOOTHING FUNCTION _________________________________________________________
 
 # This function will apply the central smooth function twice to a signal. The first time will cause a phase shift, but by reversing the output
 # of the first smooth and putting through the filter the same phase shift occurs but back in the opposite direction, cancelling the first
 # shift.    
+# dtype, out, axis, workers: see central_smooth
+
+# The two smooths arent done one after the other though. Away from the ends of the signal each point of the second smooth is the mean of
+# points_in_rolling_average means of the first, which adds up to a single weighted mean of the 2*points_in_rolling_average-1 points around
+# it, with weights that fall off linearly from the centre (a triangular kernel):
+#     smoothed_signal[i] = sum of (points_in_rolling_average - |k|)*signal[i+k] for k = -(points_in_rolling_average-1) to (points_in_rolling_average-1),
+#                          divided by points_in_rolling_average**2
+# so the middle of the smoothed signal is one convolution of the signal with the triangular kernel, done a block at a time straight into the
+# output. Only the first and last points_in_rolling_average-1 points, whose windows reach the shortened edge windows of the central smooth, are
+# worked out by smoothing twice, which only needs the 2*(points_in_rolling_average-1) points at each end of the signal. The output is the only
+# array the length of the signal that is made (none if out is given), and matches smoothing twice to rounding. Signals too short to have a middle
+# are just smoothed twice.
     
-def zero_phase_shift_smooth(signal, points_in_rolling_average):
-    first_smooth = central_smooth(signal, points_in_rolling_average)
-    second_smooth = central_smooth(first_smooth[::-1], points_in_rolling_average)
-    smoothed_signal = second_smooth[::-1]
+def zero_phase_shift_smooth(signal, points_in_rolling_average, interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
     
-    return(smoothed_signal)
+    from yes_no_input_checker import odd_number_checker
+    
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
+    return(_smooth_along_axis(_zero_phase_shift_smooth, signal, points_in_rolling_average, dtype, out, axis, workers))
+
+# Zero phase shift smooths the signals along the last axis of signal into out
+def _zero_phase_shift_smooth(signal, points_in_rolling_average, out):
+    
+    from numpy import empty, arange, float64
+    
+    N = signal.shape[-1]
+    half_window = int((points_in_rolling_average-1)/2)
+    edge = 2*half_window            # the points at each end that reach the edge windows
+    
+    if N <= 4*edge + 1:
+        first_smooth = empty(signal.shape)
+        _central_smooth(signal, points_in_rolling_average, first_smooth)
+        _central_smooth(first_smooth[..., ::-1], points_in_rolling_average, out[..., ::-1])
+        return
+    
+    # THE MIDDLE, CONVOLVED WITH THE TRIANGULAR KERNEL -------------------
+    _convolve_middle(signal, (points_in_rolling_average - abs(arange(-edge, edge+1)))/points_in_rolling_average**2, out)
+    
+    # THE ENDS, SMOOTHED TWICE -------------------
+    # The first smooth of the first 3*half_window points only needs the first 4*half_window points of the signal, and the end is done the same
+    # way on the reversed signal, as the central smooth of a signal this long is the same forwards and backwards.
+    for end_signal, end_output in ((signal[..., :2*edge], out[..., :edge]), (signal[..., ::-1][..., :2*edge], out[..., ::-1][..., :edge])):
+        first_smooth = _window_means(end_signal, lambda j: _central_windows(j, N, half_window), edge + half_window, float64)
+        _window_means(first_smooth, lambda i: _central_windows(i, N, half_window), edge, out.dtype, end_output)
+
+# Writes the convolution of the signals along the last axis of signal with the (odd length, symmetric) kernel into out, for the points whose
+# kernel is entirely within the signal, ie all but the first and last (len(kernel)-1)/2 points. It is done a block of points at a time, so
+# the only working arrays are the size of a block (scipy.signal.convolve picks a direct or fft convolution for each block, whichever is quicker).
+def _convolve_middle(signal, kernel, out):
+    
+    from numpy import asarray, float64
+    from scipy.signal import convolve
+    
+    N = signal.shape[-1]
+    edge = int((len(kernel)-1)/2)
+    kernel = kernel.reshape((1,)*(signal.ndim-1) + (len(kernel),))
+    block_length = max(2**16, 8*kernel.size)
+    for start in range(edge, N-edge, block_length):
+        stop = min(start + block_length, N-edge)
+        out[..., start:stop] = convolve(asarray(signal[..., start-edge:stop+edge], dtype = float64), kernel, mode = 'valid')
+
+# ---_______________________________ GAUSSIAN AND SAVITZKY-GOLAY SMOOTHING FUNCTIONS _________________________________________________________
+
+# These are central smooths like central_smooth, but rather than the plain mean of the points in the window they take a weighted mean:
+#     gaussian_smooth: the weights are a gaussian centred on the point, exp(-0.5*(m/sigma)**2) for the points m from the centre, normalized to add
+#                      up to one. It smooths more gently than the rolling average, without its ripples in the frequency domain.
+#     savitzky_golay_smooth: the value at the point of the least squares fit of a polynomial (of order polyorder) to the points in the window, see
+#                            Savitzky and Golay - 1964 - Smoothing and Differentiation of Data by Simplified Least Squares Procedures. It keeps the
+#                            height and width of peaks much better than the rolling average (which it is when polyorder is 0 or 1).
+# The edges are treated the same way as central_smooth, the points within (points_in_rolling_average-1)/2 of either end use the largest window
+# centred on them that fits in the signal, ie 2*i+1 points for the i'th point from the end, with the weights of that shorter window (a gaussian
+# with the same sigma, or a fit of order up to 2*i, as the fit needs more points than its order), so the first and last points are left as they
+# are. (If the signal is shorter than the window every point uses the largest centred window that fits.)
+
+# The weights only depend on the window length and sigma or polyorder, so they are worked out once and kept in a least recently used cache of the
+# last KERNEL_CACHE_SIZE kernels, as are the weights of the shorter edge windows, so smoothing many signals with the same settings only works them
+# out once. The middle of the signal is then a single convolution with the weights, and the edges a single matrix multiplication.
+
+# INPUTS:
+# signal, points_in_rolling_average, interactive, dtype, out, axis, workers: see central_smooth
+# sigma: the standard deviation of the gaussian in points, by default (points_in_rolling_average-1)/6, so the window is +- 3 sigma
+# polyorder: the order of the polynomial fitted, 2 (a quadratic) by default. It must be less than points_in_rolling_average.
+
+KERNEL_CACHE_SIZE = 64
+
+def gaussian_smooth(signal, points_in_rolling_average, sigma = 'unspecified', interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
+    
+    from yes_no_input_checker import odd_number_checker, InvalidInputError
+    
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
+    if sigma == 'unspecified':
+        sigma = max((points_in_rolling_average-1)/6, 1e-3)     # (a one point window has no width to set sigma from, and no use for it)
+    if not sigma > 0:
+        raise InvalidInputError('sigma must be above zero, but ' + str(sigma) + ' was entered')
+    
+    smoother = lambda signal, points_in_rolling_average, out: _kernel_smooth(signal, points_in_rolling_average, out, 'gaussian', float(sigma))
+    return(_smooth_along_axis(smoother, signal, points_in_rolling_average, dtype, out, axis, workers))
 
+def savitzky_golay_smooth(signal, points_in_rolling_average, polyorder = 2, interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
+    
+    from yes_no_input_checker import odd_number_checker, InvalidInputError
+    
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
+    if polyorder < 0 or polyorder != int(polyorder) or polyorder >= points_in_rolling_average:
+        raise InvalidInputError('polyorder must be a whole number from 0 to points_in_rolling_average-1, but ' + str(polyorder) + ' was entered')
+    
+    smoother = lambda signal, points_in_rolling_average, out: _kernel_smooth(signal, points_in_rolling_average, out, 'savitzky-golay', int(polyorder))
+    return(_smooth_along_axis(smoother, signal, points_in_rolling_average, dtype, out, axis, workers))
+
+# Smooths the signals along the last axis of signal into out with the kind ('gaussian' or 'savitzky-golay') of kernel, see above
+def _kernel_smooth(signal, points_in_rolling_average, out, kind, parameter):
+    
+    from numpy import asarray, float64
+    
+    N = signal.shape[-1]
+    half_window = int((points_in_rolling_average-1)/2)
+    
+    if N <= 2*half_window:      # no point has a whole window, so each point uses the largest centred window that fits
+        for i in range(N):
+            half_width = min(i, N-1-i)
+            out[..., i] = asarray(signal[..., i-half_width:i+half_width+1], dtype = float64) @ _smoothing_kernel(kind, half_width, parameter)
+        return
+    
+    _convolve_middle(signal, _smoothing_kernel(kind, half_window, parameter), out)
+    if half_window > 0:
+        edge_weights = _edge_weights(kind, half_window, parameter).T
+        out[..., :half_window] = asarray(signal[..., :2*half_window-1], dtype = float64) @ edge_weights
+        out[..., ::-1][..., :half_window] = asarray(signal[..., ::-1][..., :2*half_window-1], dtype = float64) @ edge_weights      # the kernels are symmetric
 
+# The weights of the window of 2*half_width+1 points, see above. NB the cached arrays are shared, so they are read only.
+@lru_cache(maxsize = KERNEL_CACHE_SIZE)
+def _smoothing_kernel(kind, half_width, parameter):
+    kernel = _make_smoothing_kernel(kind, half_width, parameter)
+    kernel.flags.writeable = False
+    return(kernel)
 
+# (uncached, so making the edge weights doesnt fill the cache with every shorter kernel)
+def _make_smoothing_kernel(kind, half_width, parameter):
+    
+    from numpy import arange, exp
+    from scipy.signal import savgol_coeffs
+    
+    if kind == 'gaussian':
+        kernel = exp(-0.5*(arange(-half_width, half_width+1)/parameter)**2)
+        return(kernel/kernel.sum())
+    return(savgol_coeffs(2*half_width+1, min(parameter, 2*half_width)))
 
-        
\ No newline at end of file
+# The weights of the first half_window points of a signal, row i is the weights of the first 2*i+1 points of the signal for the i'th point
+@lru_cache(maxsize = KERNEL_CACHE_SIZE)
+def _edge_weights(kind, half_window, parameter):
+    
+    from numpy import zeros
+    
+    edge_weights = zeros((half_window, 2*half_window-1))
+    for i in range(half_window):
+        edge_weights[i, :2*i+1] = _make_smoothing_kernel(kind, i, parameter)
+    edge_weights.flags.writeable = False
+    return(edge_weights)
+
+# ---_______________________________ EXPONENTIAL SMOOTHING FUNCTION _________________________________________________________
+
+# An exponential moving average, a causal smooth like causal_smooth, but with weights that fall off exponentially into the past rather than a
+# window of equal weights:
+#     smoothed_signal[i] = sum of (1-alpha)**j * signal[i-j] for j = 0 to i, divided by the sum of (1-alpha)**j for j = 0 to i
+# alpha is 2/(points_in_rolling_average+1), which gives it the same delay ((points_in_rolling_average-1)/2 points) as a causal_smooth of
+# points_in_rolling_average points. The start is treated the same way as causal_smooth, each point is the weighted mean of only the points
+# there are, so smoothed_signal[0] = signal[0] and the early points arent pulled towards zero (or towards the first point).
+
+# The sum is the recursion sum[i] = signal[i] + (1-alpha)*sum[i-1], which is O(N) and is done by scipy.signal.lfilter in compiled code, and the
+# sum of the weights has the closed form (1 - (1-alpha)**(i+1))/alpha.
+
+# INPUTS:
+# signal, points_in_rolling_average, interactive, dtype, out, axis, workers: see causal_smooth
+# alpha: optionally, the smoothing factor (0 < alpha <= 1) to use instead of 2/(points_in_rolling_average+1), the larger it is the less smoothing
+
+def exponential_smooth(signal, points_in_rolling_average, alpha = 'unspecified', interactive = 'unspecified', dtype = 'unspecified', out = None, axis = 'unspecified', workers = 1):
+    
+    from yes_no_input_checker import odd_number_checker, InvalidInputError
+    
+    points_in_rolling_average = odd_number_checker(points_in_rolling_average, interactive)
+    if alpha == 'unspecified':
+        alpha = 2/(points_in_rolling_average+1)
+    if not 0 < alpha <= 1:
+        raise InvalidInputError('alpha must be above 0 and at most 1, but ' + str(alpha) + ' was entered')
+    
+    smoother = lambda signal, points_in_rolling_average, out: _exponential_smooth(signal, float(alpha), out)
+    return(_smooth_along_axis(smoother, signal, points_in_rolling_average, dtype, out, axis, workers))
+
+# (done a block of POINTS_BLOCK_SIZE points at a time, carrying the recursions state between blocks, so the working arrays stay the size of a block)
+def _exponential_smooth(signal, alpha, out):
+    
+    from numpy import asarray, arange, expm1, log1p, float64, zeros
+    from scipy.signal import lfilter
+    
+    N = signal.shape[-1]
+    state = zeros(signal.shape[:-1] + (1,))
+    block_length = max(POINTS_BLOCK_SIZE*N//max(signal.size, 1), 2**12)
+    for start in range(0, N, block_length):
+        stop = min(start + block_length, N)
+        weighted_sums, state = lfilter([1.0], [1.0, alpha-1], asarray(signal[..., start:stop], dtype = float64), axis = -1, zi = state)
+        n = arange(start+1, stop+1)
+        sums_of_weights = 1.0 if alpha == 1 else -expm1(n*log1p(-alpha))/alpha       # (only the point itself has any weight when alpha is 1)
+        out[..., start:stop] = weighted_sums/sums_of_weights
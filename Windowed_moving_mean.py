@@ -19,22 +19,38 @@ THINGS TO NOTE
 INPUTS
 arr: the array the moving mean is calculated for
 window_length: the number of points to be included in the mean calculation, aka the window length
+dtype: the floating point type the mean and standard deviation are calculated in and returned as, float64 by default (or the dtype of out if
+       it is given). float32 halves the memory used, but is only accurate to about 7 significant figures (a relative error of 6e-8) of the size
+       of arr, and the standard deviation of a window with a large mean (eg 1e4 +- 0.01) loses most of its significant figures, so remove the
+       mean first or keep it in float64.
+out: optionally, a tuple of two arrays (each the length of arr) the mean and standard deviation are written into rather than new arrays, eg
+     slices of a memory mapped file. They are also what is returned.
+NB unlike the smooths in Smooth.py this still works the mean and standard deviation out one point at a time in a python loop, so dtype and out
+only change the memory the outputs take, float32 (or out) is no quicker.
 
 OUTPUT
 mean_arr: an array of the windowed mean for each point
+std_arr: an array of the windowed standard deviation for each point
 """
 
 import numpy as np
 
-def moving_mean_and_std_finder(arr, window_length):
+def moving_mean_and_std_finder(arr, window_length, dtype = 'unspecified', out = None):
+    
+    from yes_no_input_checker import output_array_checker
     
     if window_length&1 != 1:
         raise Exception('The window length input is not an odd number as it should be.')
     if window_length > len(arr):
         raise Exception('The length of the input array is less than the desired window length for which the mean is calculated.')
+    
+    mean_out, std_out = (None, None) if out is None else out
+    dtype = output_array_checker(mean_out, (len(arr),), dtype, 'out[0] (the mean)')
+    dtype = output_array_checker(std_out, (len(arr),), dtype, 'out[1] (the standard deviation)')
+    arr = np.asarray(arr, dtype = dtype)
         
-    mean_arr = np.zeros(len(arr))
-    std_arr = np.zeros(len(arr))
+    mean_arr = np.zeros(len(arr), dtype = dtype) if mean_out is None else mean_out
+    std_arr = np.zeros(len(arr), dtype = dtype) if std_out is None else std_out
 
     for i in range(0,len(arr)):    
 
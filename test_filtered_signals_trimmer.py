@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# _________________________________________________ TESTING THE FILTERED SIGNALS TRIMMER ____________________________________________
+
+# Checks filtered_signals_trimmer (in Filters.py) trims dictionaries, 2-D arrays and DataFrames of signals to views, without changing the
+# signals passed in when in_place is False, and the trim it applies when time_shift_removed is 'n' (Nf-1 points, a dictionary of signals
+# used to have Nf trimmed). Run with pytest, or on its own:
+#     python test_filtered_signals_trimmer.py
+
+# --- IMPORTING MODULES ________________________________________
+import sys
+import os
+import numpy
+
+# --- IMPORTING FUNCTIONS ______________________________________
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from Filters import filtered_signals_trimmer
+
+Nf = 11
+
+def test_dictionary_not_in_place_returns_views_and_leaves_input_unchanged():
+    signals = {'P_vent': numpy.arange(100.0), 'ECG': numpy.arange(100.0)*2}
+    originals = {key: values.copy() for key, values in signals.items()}
+    
+    trimmed = filtered_signals_trimmer(signals, Nf, 'y', in_place = False, interactive = False)
+    
+    assert trimmed is not signals
+    for key in signals:
+        assert signals[key] is not trimmed[key]
+        numpy.testing.assert_array_equal(signals[key], originals[key])
+        assert numpy.shares_memory(trimmed[key], signals[key])
+        numpy.testing.assert_array_equal(trimmed[key], originals[key][5:95])
+
+def test_2d_array_returns_view_and_leaves_input_unchanged():
+    signals = numpy.arange(300.0).reshape(3, 100)
+    original = signals.copy()
+    
+    trimmed = filtered_signals_trimmer(signals, Nf, 'n', in_place = False, interactive = False)
+    
+    numpy.testing.assert_array_equal(signals, original)
+    assert numpy.shares_memory(trimmed, signals)
+    numpy.testing.assert_array_equal(trimmed, original[:, Nf-1:])
+    numpy.testing.assert_array_equal(filtered_signals_trimmer(signals.T, Nf, 'n', axis = 0, interactive = False), original.T[Nf-1:])
+
+def test_dataframe_returns_view_and_leaves_input_unchanged():
+    try:
+        import pandas
+    except ImportError:
+        return
+    signals = pandas.DataFrame({'P_vent': numpy.arange(100.0), 'ECG': numpy.arange(100.0)*2})
+    original = signals.copy()
+    
+    trimmed = filtered_signals_trimmer(signals, Nf, 'y', in_place = False, interactive = False)
+    
+    pandas.testing.assert_frame_equal(signals, original)
+    assert numpy.shares_memory(trimmed.to_numpy(), signals.to_numpy())
+    pandas.testing.assert_frame_equal(trimmed, original.iloc[5:95])
+
+def test_dictionary_trim_without_time_shift_removed_is_Nf_minus_1():
+    # Regression test, a dictionary of signals filtered without the time shift removed used to have Nf points trimmed from its start,
+    # one more than the Nf-1 unusable points (and than a single array is trimmed by)
+    signals = {'P_vent': numpy.arange(100.0), 'P_vent_filtered': numpy.arange(100.0)}
+    
+    trimmed = filtered_signals_trimmer(signals, {'Nf_P_vent_filtered': Nf}, 'n', in_place = False, interactive = False)
+    
+    for key in signals:
+        assert len(trimmed[key]) == 100 - (Nf-1)
+        assert trimmed[key][0] == Nf-1
+    numpy.testing.assert_array_equal(trimmed['P_vent'], filtered_signals_trimmer(signals['P_vent'], Nf, 'n', interactive = False))
+
+def test_dictionary_in_place_default_still_replaces_the_callers_signals():
+    signals = {'P_vent': numpy.arange(100.0)}
+    
+    trimmed = filtered_signals_trimmer(signals, Nf, 'n', interactive = False)
+    
+    assert trimmed is signals
+    assert len(signals['P_vent']) == 100 - (Nf-1)
+
+# --- RUN SPACE ________________________________________________
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print('passed: ' + name)
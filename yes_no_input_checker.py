@@ -8,12 +8,79 @@ Created on Wed Apr  6 12:05:12 2016
 # This function simply takes a user input which should either be 'y' for yes or 'n' for no. If the input is anything other
 # than those two options the function simply asks the user to re-enter there input.
 
+# The input checkers in this file (and the peak finders, smoothing and filter functions that use them) can also be run in a
+# non-interactive mode, where instead of asking the user to re-enter an invalid input an exception is raised. This is needed when
+# the functions run somewhere nobody can answer, eg in a process pool or a service, where input() would wait forever.
+
+# INTERACTIVE INPUT ---------------------
+# interactive: True to ask the user to re-enter invalid inputs, False to raise an exception instead. If it is 'unspecified' (the
+#              default) the user is only asked if there is a terminal to ask them in, ie if stdin is a TTY.
+
+# ---------------------------------------------- INPUT ERRORS ------------------------------------------------------
+
+# The exceptions raised in non-interactive mode. They all inherit from InvalidInputError (which is a ValueError), so catching
+# InvalidInputError catches any of them.
+
+class InvalidInputError(ValueError):
+    pass
+
+class MissingInputError(InvalidInputError):        # a required input wasnt given
+    pass
+
+class EvenNumberError(InvalidInputError):          # a number that must be odd (eg a window length) was even
+    pass
+
+class YesNoInputError(InvalidInputError):          # an input that must be 'y' or 'n' wasnt
+    pass
+
+# INTERACTIVE MODE ----------------------------
+
+# Returns whether the user should be asked to re-enter an invalid input, see INTERACTIVE INPUT above.
+def interactive_mode(interactive = 'unspecified'):
+    if interactive == 'unspecified':
+        import sys
+        return(sys.stdin is not None and sys.stdin.isatty())
+    return(interactive)
+
 # YES_NO_INPUT_CHECKER ----------------------------
 
 # This function is used to check the user input is either 'y' for yes or 'n' for no.
-def yes_no_input_checker(user_input):
+def yes_no_input_checker(user_input, interactive = 'unspecified'):
     if user_input != 'y' and user_input != 'n':
+        if not interactive_mode(interactive):
+            raise YesNoInputError("Invalid input '" + str(user_input) + "', it must be y for yes or n for no")
         user_input = input('Invalid input, please re-enter y for yes or n for no: ')
-        return(yes_no_input_checker(user_input))
+        return(yes_no_input_checker(user_input, interactive))
     else:
-        return(user_input)
\ No newline at end of file
+        return(user_input)
+
+# ODD_NUMBER_CHECKER ----------------------------
+
+# This function is used to check a number, eg the number of points in a rolling average, is odd.
+def odd_number_checker(number_to_check, interactive = 'unspecified', description = 'Number of points used in rolling average'):
+    if number_to_check%2 == 0:  # if this condition is true then the number is even
+        if not interactive_mode(interactive):
+            raise EvenNumberError(description + ' should be odd, but ' + str(number_to_check) + ' was entered')
+        re_entered_number_to_check = int(input(description + ' should be odd, please re-enter the number: '))
+        return(odd_number_checker(re_entered_number_to_check, interactive, description))
+    return(number_to_check)
+
+# OUTPUT_ARRAY_CHECKER ----------------------------
+
+# The filters and smoothers can write their output into an array the caller has already made (their out input), eg a slice of a memory mapped
+# file, and can calculate in float32 rather than float64 (their dtype input). This function checks out (if it was given) is a float array of
+# the output shape, and returns the dtype the output should be calculated in: dtype if it was given, otherwise outs dtype, otherwise float64.
+# An out or dtype that doesnt fit always raises an InvalidInputError, as the user cant re-enter an array.
+def output_array_checker(out, shape, dtype = 'unspecified', description = 'out'):
+    import numpy
+    if isinstance(dtype, str) and dtype == 'unspecified':
+        dtype = numpy.float64 if out is None else out.dtype
+    dtype = numpy.dtype(dtype)
+    if not numpy.issubdtype(dtype, numpy.floating):
+        raise InvalidInputError('The dtype must be a floating point type (eg float32 or float64), but ' + str(dtype) + ' was entered')
+    if out is not None:
+        if tuple(out.shape) != tuple(shape):
+            raise InvalidInputError(description + ' should have the shape of the output ' + str(tuple(shape)) + ', but its shape is ' + str(tuple(out.shape)))
+        if out.dtype != dtype:
+            raise InvalidInputError(description + ' has dtype ' + str(out.dtype) + ', but dtype ' + str(dtype) + ' was entered')
+    return(dtype)